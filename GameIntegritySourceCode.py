@@ -1,148 +1,352 @@
 import sys
-import hashlib
 import os
-import subprocess
-from datetime import datetime
+import threading
+import time
+from array import array
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QPushButton, 
-                             QLabel, QFileDialog, QProgressBar, QTextEdit, 
-                             QHBoxLayout, QMessageBox, QListWidget, QSplitter, QFrame, QLineEdit,QCheckBox)
-from PyQt6.QtCore import QThread, pyqtSignal, Qt
+                             QLabel, QFileDialog, QProgressBar, QListView, 
+                             QHBoxLayout, QMessageBox, QListWidget, QListWidgetItem, QSplitter, QFrame, QLineEdit,QCheckBox, QComboBox)
+from PyQt6.QtCore import QThread, pyqtSignal, Qt, QAbstractListModel, QModelIndex
+from PyQt6.QtGui import QColor
+from integrity_engine import (HashEngine, LogStatus, ALGORITHMS, MANIFEST_EXTENSIONS, IO_BACKENDS,
+                              default_checksum_dir, manifest_path_for, find_manifest, cache_path_for,
+                              blocks_path_for, damage_path_for, journal_path_for, read_journal,
+                              scan_folder,
+                              benchmark_algorithms, benchmark_io, list_games, LibraryScheduler,
+                              ChangeWatcher, inotify_available, ContentCache, content_cache_path_for,
+                              library_index_path_for, load_library_index, save_library_index, new_index_entry,
+                              adopt_manifest,
+                              format_bytes, format_duration)
+
+# Icon and colour for each game's state in the sidebar during a library run
+GAME_STATES = {
+    "queued": ("⏳", "#90A4AE"),
+    "running": ("🔄", "#4FC3F7"),
+    "ok": ("✅", "#66BB6A"),
+    "created": ("🛠️", "#66BB6A"),
+    "problems": ("⚠️", "#FFA726"),
+    "error": ("❌", "#FF5252"),
+    "stopped": ("⏹️", "#90A4AE"),
+    "no hash": ("➖", "#777777"),
+}
+
+def game_result(mode, stats):
+    # (state, detail) for a game a library run has finished with
+    if "error" in stats:
+        return "error", ""
+    if not stats.get("completed", True):
+        return "stopped", ""
+    if mode == "generate":
+        return "created", ""
+    problems = stats["bad"] + stats["missing"]
+    return ("problems", str(problems)) if problems else ("ok", "")
+
+HASH_FILE_FILTER = f"Hash Files ({' '.join('*' + ext for ext in MANIFEST_EXTENSIONS)});;All Files (*)"
+
+# --- LOG STYLE ---
+# Prefix and colour for each LogStatus the engine reports
+LOG_STYLE = {
+    LogStatus.INFO: ("", "#E0E0E0"),
+    LogStatus.HASHED: ("HASHED: ", "#B0BEC5"),
+    LogStatus.OK: ("✅ OK: ", "#66BB6A"),
+    LogStatus.CORRUPT: ("⚠️ CORRUPT: ", "#FFA726"),
+    LogStatus.MISSING: ("❌ MISSING: ", "#FF5252"),
+    LogStatus.EXTRA: ("➕ NEW/UNKNOWN: ", "#BA68C8"),
+    LogStatus.WARNING: ("", "orange"),
+    LogStatus.ERROR: ("", "#FF5252"),
+    LogStatus.SUCCESS: ("", "#00E676"),
+    LogStatus.SUMMARY: ("", "white"),
+}
+
+# Rows still shown when "Errors Only" is ticked
+ERROR_STATUSES = {LogStatus.CORRUPT, LogStatus.MISSING, LogStatus.EXTRA,
+                  LogStatus.WARNING, LogStatus.ERROR, LogStatus.SUMMARY}
+
 
 # --- WORKER THREAD ---
 class HashWorker(QThread):
+    # Runs a HashEngine off the GUI thread and turns its callbacks into signals
     progress_update = pyqtSignal(int)
-    log_update = pyqtSignal(str, str)
+    speed_update = pyqtSignal(dict)
+    log_batch = pyqtSignal(list)
     finished_signal = pyqtSignal(dict)
     
-    def __init__(self, folder_path, mode, md5_file_path=None):
+    def __init__(self, folder_path, mode, md5_file_path=None, **options):
         super().__init__()
-        self.folder_path = folder_path
         self.mode = mode
-        self.md5_file_path = md5_file_path
-        self.is_running = True
+        self.engine = HashEngine(folder_path, mode, md5_file_path, **options,
+                                 on_log=self.log_batch.emit,
+                                 on_progress=self.progress_update.emit,
+                                 on_speed=self.speed_update.emit)
+
+    @property
+    def is_running(self):
+        return self.engine.is_running
     
     def stop(self):
-        self.is_running = False
+        self.engine.stop()
+
+    def run(self):
+        self.finished_signal.emit(self.engine.run())
+
+class LibraryWorker(QThread):
+    # Runs a whole library through a LibraryScheduler: "verify" checks every
+    # game that has a local hash, "generate" creates one for every game that
+    # doesn't. Only problems go to the log, prefixed with the game's name.
+    game_status = pyqtSignal(str, str, str)
+    progress_update = pyqtSignal(int)
+    log_batch = pyqtSignal(list)
+    finished_signal = pyqtSignal(dict)
+
+    def __init__(self, library_path, mode, checksum_dir, watcher=None, **options):
+        super().__init__()
+        self.library_path = library_path
+        self.mode = mode
+        self.checksum_dir = checksum_dir
+        self.watcher = watcher
+        self.options = options
+        self.engines = set()
+        self.scheduler = None
+        self.stopped = False
+        self.lock = threading.Lock()
+        self.games_done = 0
+        self.games_total = 0
+
+    @property
+    def is_running(self):
+        return not self.stopped
+
+    def stop(self):
+        self.stopped = True
+        if self.scheduler:
+            self.scheduler.stop()
+        for engine in list(self.engines):
+            engine.stop()
+
+    def run_game(self, game_path):
+        # Called from the scheduler's threads, one per drive
+        game_name = os.path.basename(game_path)
+        if self.mode == "generate":
+            manifest = manifest_path_for(self.checksum_dir, game_name, self.options["algorithm"])
+        else:
+            manifest = find_manifest(self.checksum_dir, game_name)
+
+        def on_log(entries):
+            problems = [(status, f"{game_name}: {text}", color)
+                        for status, text, color in entries if status in ERROR_STATUSES]
+            if problems:
+                self.log_batch.emit(problems)
 
-    def calculate_md5(self, file_path):
-        hasher = hashlib.md5()
+        changed, complete = self.watcher.take(game_path) if self.watcher else (None, False)
+        engine = HashEngine(game_path, self.mode, manifest,
+                            cache_path=cache_path_for(self.checksum_dir, game_name),
+                            block_path=blocks_path_for(self.checksum_dir, game_name),
+                            damage_path=damage_path_for(self.checksum_dir, game_name),
+                            journal_path=journal_path_for(self.checksum_dir, game_name),
+                            # Carry on where a stopped library run left off,
+                            # unless the user asked for a full rehash
+                            resume=self.options["use_cache"],
+                            changed=changed, tracked=complete,
+                            **self.options, on_log=on_log,
+                            on_progress=lambda percent: self.game_status.emit(game_name, "running", f"{percent}%"))
+        self.engines.add(engine)
+        self.game_status.emit(game_name, "running", "0%")
+        stats = engine.run()
+        self.engines.discard(engine)
+        stats["completed"] = engine.is_running
+        if self.watcher and (not stats["completed"] or "error" in stats):
+            self.watcher.give_back(game_path, changed, complete)
+        self.game_status.emit(game_name, *game_result(self.mode, stats))
+        with self.lock:
+            self.games_done += 1
+            self.progress_update.emit(int(self.games_done / self.games_total * 100))
+        return stats
+
+    def run(self):
+        start = time.perf_counter()
+        results = {"mode": self.mode, "games": {}, "skipped": 0, "devices": 0}
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(65536), b""):
-                    if not self.is_running: return None
-                    hasher.update(chunk)
-            return hasher.hexdigest()
-        except Exception:
-            return None
+            games = list_games(self.library_path)
+        except OSError as e:
+            results["error"] = str(e)
+            self.finished_signal.emit(results)
+            return
+        todo = []
+        for game_path in games:
+            game_name = os.path.basename(game_path)
+            has_manifest = os.path.exists(find_manifest(self.checksum_dir, game_name))
+            if has_manifest == (self.mode == "verify"):
+                todo.append(game_path)
+                self.game_status.emit(game_name, "queued", "")
+            else:
+                results["skipped"] += 1
+                if self.mode == "verify":
+                    self.game_status.emit(game_name, "no hash", "")
+        self.games_total = len(todo)
+        self.scheduler = LibraryScheduler(todo, self.run_game)
+        if self.stopped:
+            self.scheduler.stop()
+        for game_path, stats in self.scheduler.run().items():
+            results["games"][os.path.basename(game_path)] = stats
+        results["devices"] = len(self.scheduler.lanes)
+        results["elapsed"] = time.perf_counter() - start
+        self.finished_signal.emit(results)
+
+class LibraryScanner(QThread):
+    # Brings the saved library index up to date off the GUI thread: lists the
+    # game folders and which have a local hash, then counts files and bytes
+    # of every game not in sized. On a network share or a sleeping hard drive
+    # the listing alone can take seconds.
+    listed = pyqtSignal(str, dict)         # library_path, {game_name: has_manifest}
+    game_scanned = pyqtSignal(str, str, dict)  # library_path, game_name, {"files": ..., "size": ...}
+    failed = pyqtSignal(str, str)          # library_path, error
+
+    def __init__(self, library_path, checksum_dir, sized):
+        super().__init__()
+        self.library_path = library_path
+        self.checksum_dir = checksum_dir
+        self.sized = sized
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
 
     def run(self):
-        stats = {"ok": 0, "bad": 0, "missing": 0, "extra": 0}
-        
-        # --- GENERATE MODE ---
-        if self.mode == "generate":
-            generated_hashes = []
-            files_to_hash = []
-            for root, _, files in os.walk(self.folder_path):
-                for f in files:
-                    if f.endswith(".md5"): continue
-                    files_to_hash.append(os.path.join(root, f))
-            
-            total_files = len(files_to_hash)
-            for i, full_path in enumerate(files_to_hash):
-                if not self.is_running: break
-                rel_path = os.path.relpath(full_path, self.folder_path)
-                file_hash = self.calculate_md5(full_path)
-                if file_hash:
-                    generated_hashes.append(f"{file_hash} *{rel_path}")
-                    self.log_update.emit(f"HASHED: {rel_path}", "#B0BEC5")
-                self.progress_update.emit(int(((i + 1) / total_files) * 100) if total_files > 0 else 100)
-            stats["data"] = generated_hashes
-            self.finished_signal.emit(stats)
-
-        # --- VERIFY MODE ---
-        elif self.mode == "verify":
-            master_list = {}
-            
-            # 1. READ THE MD5 FILE (This was missing!)
-            try:
-                with open(self.md5_file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith(';'): continue
-                        parts = line.split(None, 1)
-                        if len(parts) == 2:
-                            h, name = parts
-                            # Normalize path to handle Windows/Linux slashes
-                            clean_name = name.lstrip('*').replace('\\', os.sep).replace('/', os.sep)
-                            master_list[clean_name] = h.lower()
-            except Exception as e:
-                self.log_update.emit(f"ERROR reading hash file: {e}", "red")
-                return
+        try:
+            games = list_games(self.library_path)
+        except OSError as e:
+            self.failed.emit(self.library_path, str(e))
+            return
+        names = [os.path.basename(game_path) for game_path in games]
+        self.listed.emit(self.library_path, {game_name: os.path.exists(find_manifest(self.checksum_dir, game_name))
+                                             for game_name in names})
+        for game_path, game_name in zip(games, names):
+            if self.stopped: return
+            if game_name in self.sized: continue
+            files = scan_folder(game_path, lambda: self.stopped)
+            if self.stopped: return
+            self.game_scanned.emit(self.library_path, game_name,
+                                   {"files": len(files), "size": sum(key[0] for key in files.values())})
 
-            # 2. SCAN CURRENT FOLDER
-            current_files = []
-            for root, _, files in os.walk(self.folder_path):
-                for f in files:
-                    if f.endswith(".md5"): continue
-                    # Get relative path
-                    rel_path = os.path.relpath(os.path.join(root, f), self.folder_path)
-                    current_files.append(rel_path)
-
-            # 3. VERIFY FILES
-            total_items = len(master_list)
-            processed = 0
-            
-            for rel_path, expected_hash in master_list.items():
-                if not self.is_running: break
-                full_path = os.path.join(self.folder_path, rel_path)
-                
-                # Check if it exists
-                if not os.path.exists(full_path):
-                    self.log_update.emit(f"❌ MISSING: {rel_path}", "#FF5252")
-                    stats["missing"] += 1
-                else:
-                    # Calculate Hash
-                    current_hash = self.calculate_md5(full_path)
-                    if current_hash == expected_hash:
-                        self.log_update.emit(f"✅ OK: {rel_path}", "#66BB6A")
-                        stats["ok"] += 1
-                    else:
-                        self.log_update.emit(f"⚠️ CORRUPT: {rel_path}", "#FFA726")
-                        stats["bad"] += 1
-                
-                # REMOVE FROM EXTRA LIST (Important!)
-                if rel_path in current_files:
-                    current_files.remove(rel_path)
-                
-                processed += 1
-                self.progress_update.emit(int((processed / total_items) * 100) if total_items > 0 else 100)
-
-            # 4. REPORT EXTRAS
-            stats["extra"] = len(current_files)
-            for extra_file in current_files:
-                self.log_update.emit(f"➕ NEW/UNKNOWN: {extra_file}", "#BA68C8")
-
-            self.finished_signal.emit(stats)
+class BenchmarkWorker(QThread):
+    # Times every hash algorithm in memory and, if a game is selected, every
+    # I/O backend on its largest file. Off the GUI thread, both can take a while.
+    finished_signal = pyqtSignal(dict)
+
+    def __init__(self, folder_path=None):
+        super().__init__()
+        self.folder_path = folder_path
+
+    def run(self):
+        results = {"hash": benchmark_algorithms()}
+        if self.folder_path:
+            files = scan_folder(self.folder_path)
+            if files:
+                rel_path = max(files, key=lambda path: files[path][0])
+                try:
+                    results["io"] = benchmark_io(os.path.join(self.folder_path, rel_path))
+                    results["io_file"] = (rel_path, files[rel_path][0])
+                except OSError:
+                    pass
+        self.finished_signal.emit(results)
+
+# --- LOG MODEL ---
+class LogModel(QAbstractListModel):
+    # Keeps one byte of status + one string per row; the text shown on screen
+    # is only built for the rows the QListView actually paints, so 150k
+    # results cost about as much memory as the paths themselves.
+    def __init__(self):
+        super().__init__()
+        self.statuses = array('B')
+        self.texts = []
+        self.colors = {}
+        self.error_rows = array('I')
+        self.errors_only = False
+        self.brushes = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.error_rows) if self.errors_only else len(self.texts)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.error_rows[index.row()] if self.errors_only else index.row()
+        status = self.statuses[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return LOG_STYLE[status][0] + self.texts[row]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            color = self.colors.get(row, LOG_STYLE[status][1])
+            if color not in self.brushes:
+                self.brushes[color] = QColor(color)
+            return self.brushes[color]
+        return None
+
+    def add_entries(self, entries):
+        first_row = len(self.texts)
+        new_errors = array('I', (first_row + i for i, (status, _, _) in enumerate(entries)
+                                 if status in ERROR_STATUSES))
+        visible = len(new_errors) if self.errors_only else len(entries)
+        start = self.rowCount()
+        if visible:
+            self.beginInsertRows(QModelIndex(), start, start + visible - 1)
+        for status, text, color in entries:
+            if color:
+                self.colors[len(self.texts)] = color
+            self.statuses.append(status)
+            self.texts.append(text)
+        self.error_rows.extend(new_errors)
+        if visible:
+            self.endInsertRows()
+
+    def set_errors_only(self, errors_only):
+        self.beginResetModel()
+        self.errors_only = errors_only
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.statuses = array('B')
+        self.texts = []
+        self.colors = {}
+        self.error_rows = array('I')
+        self.endResetModel()
+
+    def to_text(self):
+        rows = self.error_rows if self.errors_only else range(len(self.texts))
+        return "\n".join(LOG_STYLE[self.statuses[row]][0] + self.texts[row] for row in rows)
 
 class IntegrityDashboard(QWidget):
     def __init__(self):
         super().__init__()
         self.library_path = ""
         self.current_game_path = ""
+        self.game_items = {}
         self.worker = None
+        self.watcher = None
+        self.taken_changes = None
         self.ensure_checksum_folder()
+        # Shared by every run, so hardlinked files are hashed once across games
+        self.content_cache = ContentCache(content_cache_path_for(self.checksum_dir))
+        self.scanner = None
+        # Replaced scanners stay referenced until their thread has finished,
+        # a QThread destroyed while running takes the app down with it
+        self.scanners = set()
+        self.index_path = library_index_path_for(self.checksum_dir)
+        self.library_index = load_library_index(self.index_path)
         self.initUI()
-        self.all_messages = [] 
+        if self.library_index["library"]:
+            # Drawn from the index straight away, the scanner catches up later
+            self.library_path = self.library_index["library"]
+            self.lbl_path.setText(self.library_path)
+            self.refresh_list()
+            self.btn_verify_all.setEnabled(True)
+            self.btn_gen_missing.setEnabled(True)
 
 
     def ensure_checksum_folder(self):
-        # Correctly find path whether running as .py or .exe
-        if getattr(sys, 'frozen', False):
-            base_path = os.path.dirname(sys.executable)
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-        
-        self.checksum_dir = os.path.join(base_path, "Checksums")
+        self.checksum_dir = default_checksum_dir()
         if not os.path.exists(self.checksum_dir):
             os.makedirs(self.checksum_dir)
 
@@ -159,67 +363,38 @@ class IntegrityDashboard(QWidget):
         if not self.current_game_path:
             return
         
-        content = self.log.toPlainText().strip()
+        content = self.log_model.to_text().strip()
         if not content:
-            self.log.append("<span style='color:orange'>Nothing to export! Generate a log first.</span>")
+            self.log_message("Nothing to export! Generate a log first.", LogStatus.WARNING)
             return
             
+        from datetime import datetime
         game_name = os.path.basename(self.current_game_path)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{game_name}_log_{timestamp}.txt"
         
         try:
-            content = self.log.toPlainText()
             with open(filename, 'w', encoding='utf-8') as file:
                 file.write(content)
-            self.log.append(f"<br><b style='color:cyan'>Log exported to {filename}</b>")
+            self.log_message(f"Log exported to {filename}", LogStatus.INFO, "cyan")
         except Exception as e:
             QMessageBox.critical(self, "Export Error", f"Could not save log: {e}")
 
-    def load_external_hash(self):
-        if not self.current_game_path:
-            QMessageBox.warning(self, "No Selection", "Please select a game folder on the left first.")
-            return
+    def log_message(self, text, status=LogStatus.INFO, color=None):
+        self.append_log_batch([(status, text, color)])
 
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Master Hash File", "", "Hash Files (*.md5);;All Files (*)"
-        )
-        
-        if file_path:
-            self.log.clear()
-            self.log.append(f"<b>Verifying against external hash:</b> {file_path}")
-            # Trigger the verification using the external file
-            self.toggle_controls(True)
-            self.worker = HashWorker(self.current_game_path, "verify", file_path)
-            self.worker.progress_update.connect(self.progress.setValue)
-            self.worker.log_update.connect(lambda m, c: self.log.append(f'<span style="color:{c}">{m}</span>'))
-            self.worker.finished_signal.connect(self.on_finished)
-            self.worker.start()
-    def handle_log_filtering(self, message, color):
-        self.all_messages.append((message, color))
-        is_summary = "📊" in message or "---" in message or "SUMMARY" in message
-        if self.chk_errors_only.isChecked():
-            # Added "➕" to the filter
-            if "❌" in message or "⚠️" in message or "➕" in message or is_summary:
-                self.log.append(f'<span style="color:{color}">{message}</span>')
-        else:
-            self.log.append(f'<span style="color:{color}">{message}</span>')
+    def append_log_batch(self, entries):
+        bar = self.log_view.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        self.log_model.add_entries(entries)
+        # Follow new output unless the user scrolled up to read something
+        if at_bottom:
+            self.log_view.scrollToBottom()
 
     def redraw_log(self):
-        # Prevent redrawing while the worker is still running (to avoid lag)
-        if self.worker and self.worker.isRunning():
-            return
-            
-        self.log.clear()
-        for message, color in self.all_messages:
-            is_summary = "📊" in message or "---" in message or "SUMMARY" in message
-            if self.chk_errors_only.isChecked():
-                # Show only errors + the summary/lines
-                if "❌" in message or "⚠️" in message or "➕" in message or is_summary:
-                    self.log.append(f'<span style="color:{color}">{message}</span>')
-            else:
-                # Show everything
-                self.log.append(f'<span style="color:{color}">{message}</span>')
+        # Only swaps which row list the view reads from, so it's instant
+        # even while a worker is still adding rows
+        self.log_model.set_errors_only(self.chk_errors_only.isChecked())
 
 
     def initUI(self):
@@ -235,8 +410,9 @@ class IntegrityDashboard(QWidget):
             QPushButton#btn_ver[ready="true"] { background-color: #1B5E20; border: 1px solid #2E7D32; color: white; }
             QProgressBar { border: none; background: #222; height: 6px; text-align: center; border-radius: 3px; }
             QProgressBar::chunk { background: #00A2FF; border-radius: 3px; }
-            QTextEdit { background: #080808; border: 1px solid #222; font-family: 'Consolas'; font-size: 11px; border-radius: 4px; }
+            QListView#log_view { background: #080808; border: 1px solid #222; font-family: 'Consolas'; font-size: 11px; border-radius: 4px; }
             QLineEdit { background-color: #2A2A2A; border: 1px solid #444; padding: 10px;  border-radius: 4px;font-weight: bold;}
+            QComboBox { background-color: #2A2A2A; border: 1px solid #444; padding: 0 10px; border-radius: 4px; font-weight: bold; }
         """)
 
         layout = QVBoxLayout(self)
@@ -247,13 +423,50 @@ class IntegrityDashboard(QWidget):
         self.btn_lib.clicked.connect(self.select_library)
         self.btn_open_folder = QPushButton("📁 Open Local Checksums")
         self.btn_open_folder.clicked.connect(self.open_checksum_folder)
+        self.btn_verify_all = QPushButton("📚 Verify All")
+        self.btn_verify_all.setToolTip("Verify every game that has a local hash. Games on different drives\n"
+                                       "are checked at the same time, games on the same drive one by one.")
+        self.btn_verify_all.clicked.connect(lambda: self.action_library("verify"))
+        self.btn_gen_missing = QPushButton("🧩 Generate Missing")
+        self.btn_gen_missing.setToolTip("Create a hash for every game that doesn't have one yet.")
+        self.btn_gen_missing.clicked.connect(lambda: self.action_library("generate"))
+        self.btn_verify_all.setEnabled(False)
+        self.btn_gen_missing.setEnabled(False)
         self.searchBar = QLineEdit()
         self.searchBar.setPlaceholderText("🔍 Search games...")
         self.searchBar.setFixedWidth(200)
         self.searchBar.setFixedHeight(38)
         self.searchBar.textChanged.connect(self.filter_games)
+        self.cmb_workers = QComboBox()
+        self.cmb_workers.addItem("⚙️ Workers: Auto", 0)
+        for count in (1, 2, 4, 8, 16):
+            self.cmb_workers.addItem(f"⚙️ Workers: {count}", count)
+        self.cmb_workers.setFixedHeight(38)
+        self.cmb_workers.setToolTip("How many files are hashed at the same time. Auto picks based on CPU count.")
         top_bar.addWidget(self.btn_lib,0)
         top_bar.addWidget(self.btn_open_folder,0)
+        top_bar.addWidget(self.btn_verify_all,0)
+        top_bar.addWidget(self.btn_gen_missing,0)
+        self.cmb_io = QComboBox()
+        for backend in IO_BACKENDS:
+            self.cmb_io.addItem(f"💾 I/O: {backend}", backend)
+        self.cmb_io.setFixedHeight(38)
+        self.cmb_io.setToolTip("How files are read. auto = reusable buffer, memory-mapped for files over 256 MB.\n"
+                               "Use Benchmark with a game selected to compare them on your drive.")
+        self.btn_bench = QPushButton("📈 Benchmark")
+        self.btn_bench.setFixedHeight(38)
+        self.btn_bench.setToolTip("Measure how fast each hash algorithm runs on this CPU, and with a game\n"
+                                  "selected, how fast each I/O mode reads its largest file.")
+        self.btn_bench.clicked.connect(self.action_benchmark)
+        self.chk_watch = QCheckBox("👁️ Watch Folders")
+        self.chk_watch.setToolTip("Linux only: notice changed files in the background, so Verify only has to\n"
+                                  "check those instead of every file. Falls back to a full check if it loses track.")
+        self.chk_watch.setEnabled(inotify_available())
+        self.chk_watch.stateChanged.connect(self.toggle_watcher)
+        top_bar.addWidget(self.cmb_workers,0)
+        top_bar.addWidget(self.cmb_io,0)
+        top_bar.addWidget(self.btn_bench,0)
+        top_bar.addWidget(self.chk_watch,0)
         top_bar.addWidget(self.searchBar,1)
 
         self.lbl_path = QLabel("Select your games folder to begin...")
@@ -285,26 +498,84 @@ class IntegrityDashboard(QWidget):
         self.btn_ver.setObjectName("btn_ver")
         self.btn_ver.clicked.connect(self.action_verify)
         
+        self.btn_quick = QPushButton("⏱️ Quick Check")
+        self.btn_quick.setToolTip("Only compares file sizes against the local hash. Finds missing and truncated files in seconds.")
+        self.btn_quick.clicked.connect(self.action_quick_check)
+
+        self.btn_triage = QPushButton("🚑 Triage")
+        self.btn_triage.setToolTip("Game just crashed? Checks missing files, executables/DLLs, recently modified\n"
+                                   "and small files first, and can stop as soon as it finds something.")
+        self.btn_triage.clicked.connect(self.action_triage)
+        self.cmb_triage = QComboBox()
+        for label, limits in (("Stop: never", (0, 0)), ("Stop: 1st problem", (1, 0)), ("Stop: 10 problems", (10, 0)),
+                              ("Stop: after 30 s", (0, 30)), ("Stop: after 2 min", (0, 120))):
+            self.cmb_triage.addItem(label, limits)
+        self.cmb_triage.setToolTip("When Triage stops and shows what it found so far.")
+        
         self.btn_sum = QPushButton("🛠️ Select Hash")
         self.btn_sum.clicked.connect(self.load_external_hash)
 
+        self.btn_update = QPushButton("🆕 Verify Update")
+        self.btn_update.setToolTip("After a game patch: pick the updated hash file. Only files the patch changed or\n"
+                                   "added are read, everything else keeps the result of the last check.")
+        self.btn_update.clicked.connect(self.action_update)
+
         self.btn_stop = QPushButton("🛑 Stop")
         self.btn_stop.clicked.connect(self.stop_worker)
 
+        self.chk_full_rehash = QCheckBox("Force Full Rehash")
+        self.chk_full_rehash.setToolTip("Ignore the cache and re-read every file, even ones that look unchanged.")
+
+        self.chk_blocks = QCheckBox("Block Hashes")
+        self.chk_blocks.setToolTip("When creating a hash, also hash every 16 MB of large files.\n"
+                                   "Verify can then show which parts of a corrupt archive are damaged.")
+
+        self.btn_recheck = QPushButton("🩹 Recheck Damaged")
+        self.btn_recheck.setToolTip("Re-read only the damaged blocks found by the last verify (e.g. after a repair).")
+        self.btn_recheck.clicked.connect(self.action_recheck)
+
+        self.btn_resume = QPushButton("⏯️ Resume")
+        self.btn_resume.setToolTip("Continue the last run that was stopped, skipping the files it already finished.")
+        self.btn_resume.clicked.connect(self.action_resume)
+
+        self.cmb_algorithm = QComboBox()
+        for name, info in ALGORITHMS.items():
+            self.cmb_algorithm.addItem(info[3], name)
+        self.cmb_algorithm.setToolTip("Hash used by Create Hash. Verify detects it from the manifest.\n"
+                                      "CRC32 is fastest but only catches accidental damage.")
+
         self.btn_gen.setEnabled(False)
         self.btn_ver.setEnabled(False)
+        self.btn_quick.setEnabled(False)
+        self.btn_triage.setEnabled(False)
+        self.btn_recheck.setEnabled(False)
+        self.btn_resume.setEnabled(False)
         self.btn_stop.setEnabled(False)
         self.btn_sum.setEnabled(False)
+        self.btn_update.setEnabled(False)
         
         ctrl_box.addWidget(self.btn_gen)
+        ctrl_box.addWidget(self.cmb_algorithm)
         ctrl_box.addWidget(self.btn_ver)
+        ctrl_box.addWidget(self.btn_quick)
+        ctrl_box.addWidget(self.btn_triage)
+        ctrl_box.addWidget(self.cmb_triage)
         ctrl_box.addWidget(self.btn_sum)
+        ctrl_box.addWidget(self.btn_update)
+        ctrl_box.addWidget(self.btn_recheck)
+        ctrl_box.addWidget(self.btn_resume)
+        ctrl_box.addWidget(self.chk_full_rehash)
+        ctrl_box.addWidget(self.chk_blocks)
         ctrl_box.addWidget(self.btn_stop)
         right_vbox.addLayout(ctrl_box)
 
         self.progress = QProgressBar()
         right_vbox.addWidget(self.progress)
 
+        self.lbl_speed = QLabel("")
+        self.lbl_speed.setStyleSheet("color: #777; font-size: 11px;")
+        right_vbox.addWidget(self.lbl_speed)
+
         # Log Header
         log_header = QHBoxLayout()
 
@@ -316,7 +587,7 @@ class IntegrityDashboard(QWidget):
         btn_clear = QPushButton("Clear Log")
         btn_clear.setFixedWidth(80)
         btn_clear.setStyleSheet("font-size: 10px; padding: 2px;")
-        btn_clear.clicked.connect(lambda: self.log.clear())
+        btn_clear.clicked.connect(lambda: self.log_model.clear())
         self.chk_errors_only = QCheckBox("Errors Only")
         self.chk_errors_only.setStyleSheet("font-size: 10px;")
         self.chk_errors_only.stateChanged.connect(self.redraw_log)
@@ -325,9 +596,15 @@ class IntegrityDashboard(QWidget):
         log_header.addWidget(btn_clear)
         right_vbox.addLayout(log_header)
 
-        self.log = QTextEdit()
-        self.log.setReadOnly(True)
-        right_vbox.addWidget(self.log)
+        self.log_model = LogModel()
+        self.log_view = QListView()
+        self.log_view.setObjectName("log_view")
+        self.log_view.setModel(self.log_model)
+        # Every row is one line of text, so Qt can skip measuring them and
+        # only lays out what is on screen
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        right_vbox.addWidget(self.log_view)
 
         splitter.addWidget(right_panel)
         splitter.setSizes([280, 820])
@@ -337,6 +614,7 @@ class IntegrityDashboard(QWidget):
 
 
     def open_checksum_folder(self):
+        import subprocess
         if os.path.exists(self.checksum_dir):
             if sys.platform == 'win32':
                 os.startfile(self.checksum_dir)
@@ -350,15 +628,147 @@ class IntegrityDashboard(QWidget):
         if path:
             self.library_path = path
             self.lbl_path.setText(path)
+            if path != self.library_index["library"]:
+                self.library_index = {**self.library_index, "library": path, "games": {}}
             self.refresh_list()
+            self.btn_verify_all.setEnabled(True)
+            self.btn_gen_missing.setEnabled(True)
 
     def refresh_list(self):
+        # Shows what the index knew last time right away and lets a
+        # background scan list the (maybe slow) library drive
+        self.populate_list()
+        if self.scanner:
+            self.scanner.stop()
+        sized = {game_name for game_name, entry in self.library_index["games"].items() if entry["size"] is not None}
+        self.scanner = LibraryScanner(self.library_path, self.checksum_dir, sized)
+        self.scanner.listed.connect(self.on_library_listed)
+        self.scanner.game_scanned.connect(self.on_game_scanned)
+        self.scanner.failed.connect(self.on_library_scan_failed)
+        self.scanner.finished.connect(lambda scanner=self.scanner: self.scanners.discard(scanner))
+        self.scanners.add(self.scanner)
+        self.scanner.start()
+
+    def populate_list(self):
         self.game_list.clear()
+        self.game_items = {}
+        for game_name in sorted(self.library_index["games"]):
+            # The shown text can gain a status, the name stays in UserRole
+            item = QListWidgetItem(game_name)
+            item.setData(Qt.ItemDataRole.UserRole, game_name)
+            self.game_list.addItem(item)
+            self.game_items[game_name] = item
+            self.show_index_entry(game_name)
+            if os.path.join(self.library_path, game_name) == self.current_game_path:
+                self.game_list.setCurrentItem(item)
+        self.filter_games()
+        self.update_watches()
+
+    def show_index_entry(self, game_name):
+        # Last result and size from the index, in the sidebar and its tooltip
+        entry = self.library_index["games"].get(game_name)
+        item = self.game_items.get(game_name)
+        if entry is None or item is None: return
+        if entry["result"]:
+            self.set_game_status(game_name, entry["result"], entry["detail"])
+        elif not entry["manifest"]:
+            self.set_game_status(game_name, "no hash", "")
+        else:
+            item.setText(game_name)
+            item.setForeground(QColor("#E0E0E0"))
+        tooltip = []
+        if entry["size"] is not None:
+            tooltip.append(f"{entry['files']} files, {format_bytes(entry['size'])}")
+        if entry["checked"]:
+            tooltip.append("Last checked " + time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["checked"])))
+        item.setToolTip("\n".join(tooltip))
+
+    def on_library_listed(self, library_path, games):
+        if library_path != self.library_path: return
+        known = self.library_index["games"]
+        listed = {}
+        for game_name, has_manifest in games.items():
+            entry = known.get(game_name) or new_index_entry()
+            if entry["manifest"] and not has_manifest:
+                # Its hash was deleted, the old result no longer means anything
+                entry = {**entry, "result": None, "detail": ""}
+            entry["manifest"] = has_manifest
+            listed[game_name] = entry
+        self.library_index["games"] = listed
+        if set(listed) != set(known) or not self.game_items:
+            self.populate_list()
+        else:
+            for game_name in listed:
+                self.show_index_entry(game_name)
+        self.save_library_index()
+
+    def on_game_scanned(self, library_path, game_name, sizes):
+        if library_path != self.library_path: return
+        entry = self.library_index["games"].get(game_name)
+        if entry is None: return
+        entry.update(sizes)
+        self.show_index_entry(game_name)
+        self.save_library_index()
+
+    def on_library_scan_failed(self, library_path, error):
+        if library_path != self.library_path: return
+        self.log_message(f"Could not list {library_path}: {error}", LogStatus.ERROR)
+
+    def save_library_index(self):
         try:
-            dirs = [d for d in os.listdir(self.library_path) if os.path.isdir(os.path.join(self.library_path, d))]
-            self.game_list.addItems(sorted(dirs))
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not list directory: {e}")
+            save_library_index(self.index_path, self.library_index)
+        except OSError as e:
+            self.log_message(f"Could not save the library index: {e}", LogStatus.WARNING)
+
+    def record_result(self, game_name, mode, stats):
+        # Remembers a finished run in the index so the sidebar shows it next launch
+        entry = self.library_index["games"].get(game_name)
+        if entry is None or "error" in stats or not stats.get("completed", True): return
+        if mode == "generate":
+            entry["manifest"] = True
+        if mode in ("generate", "verify"):
+            entry["result"], entry["detail"] = game_result(mode, stats)
+            entry["checked"] = time.time()
+        if "disk_files" in stats:
+            entry["files"], entry["size"] = stats["disk_files"], stats["disk_bytes"]
+
+    def toggle_watcher(self):
+        if self.chk_watch.isChecked():
+            self.watcher = ChangeWatcher(self.checksum_dir)
+            try:
+                self.watcher.start()
+            except OSError as e:
+                self.watcher = None
+                self.log_message(f"Could not watch the game folders: {e}", LogStatus.ERROR)
+                return
+            self.update_watches()
+            self.log_message("👁️ Watching game folders. The next verify of each game still checks every file once.")
+        elif self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def update_watches(self):
+        if self.watcher:
+            self.watcher.watch([os.path.join(self.library_path, game_name) for game_name in self.game_items])
+
+    def take_changes(self, mode):
+        # Hands the watcher's dirty set for this game to a run that can use
+        # it (verify) or makes it obsolete (generate)
+        self.taken_changes = None
+        if self.watcher is None or mode not in ("generate", "verify"):
+            return {}
+        changed, complete = self.watcher.take(self.current_game_path)
+        self.taken_changes = (self.current_game_path, changed, complete)
+        return {"changed": changed, "tracked": complete}
+
+    def closeEvent(self, event):
+        if self.watcher:
+            self.watcher.stop()
+        for scanner in list(self.scanners):
+            # Stopped scanners give up at the next folder, so this is short
+            scanner.stop()
+            scanner.wait()
+        super().closeEvent(event)
 
     def update_game_selection(self):
         item = self.game_list.currentItem()
@@ -366,22 +776,26 @@ class IntegrityDashboard(QWidget):
             return
         
         
-        game_name = item.text()
+        game_name = item.data(Qt.ItemDataRole.UserRole)
         self.current_game_path = os.path.join(self.library_path, game_name)
         self.lbl_title.setText(game_name)
-        md5_path = os.path.join(self.checksum_dir, f"{game_name}.md5")
-        local_exists = os.path.exists(md5_path)
-        
-        md5_path = os.path.join(self.checksum_dir, f"{game_name}.md5")
-        exists = os.path.exists(md5_path)
-        
+        # Only the local Checksums folder is touched here, never the library drive
+        local_exists = os.path.exists(find_manifest(self.checksum_dir, game_name))
 
         self.btn_gen.setEnabled(True)
         self.btn_ver.setEnabled(local_exists)
+        self.btn_quick.setEnabled(local_exists)
+        self.btn_triage.setEnabled(local_exists)
+        self.btn_update.setEnabled(local_exists)
+        self.btn_recheck.setEnabled(os.path.exists(damage_path_for(self.checksum_dir, game_name)))
+        journal, _ = read_journal(journal_path_for(self.checksum_dir, game_name), header_only=True)
+        self.btn_resume.setEnabled(journal is not None)
+        self.btn_resume.setText("⏯️ Resume " + ("Create Hash" if journal and journal["mode"] == "generate" else "Verify")
+                                if journal else "⏯️ Resume")
         self.btn_stop.setEnabled(True)
         self.btn_sum.setEnabled(True)
-        self.btn_ver.setProperty("ready", "true" if exists else "false")
-        self.btn_ver.setText("🔍 Verify Using Local Hash" if exists else "🔍 (No Local Hash Found)")
+        self.btn_ver.setProperty("ready", "true" if local_exists else "false")
+        self.btn_ver.setText("🔍 Verify Using Local Hash" if local_exists else "🔍 (No Local Hash Found)")
         self.btn_ver.style().unpolish(self.btn_ver)
         self.btn_ver.style().polish(self.btn_ver)
 
@@ -389,91 +803,429 @@ class IntegrityDashboard(QWidget):
         if busy:
             self.btn_gen.setEnabled(False)
             self.btn_ver.setEnabled(False)
+            self.btn_quick.setEnabled(False)
+            self.btn_triage.setEnabled(False)
+            self.cmb_triage.setEnabled(False)
+            self.btn_update.setEnabled(False)
+            self.btn_recheck.setEnabled(False)
+            self.btn_resume.setEnabled(False)
             self.btn_sum.setEnabled(False)
             self.btn_lib.setEnabled(False)
+            self.btn_verify_all.setEnabled(False)
+            self.btn_gen_missing.setEnabled(False)
             self.game_list.setEnabled(False)
-            self.chk_errors_only.setEnabled(False)
+            self.cmb_workers.setEnabled(False)
+            self.cmb_io.setEnabled(False)
+            self.cmb_algorithm.setEnabled(False)
+            self.btn_bench.setEnabled(False)
+            self.chk_full_rehash.setEnabled(False)
+            self.chk_blocks.setEnabled(False)
             self.btn_stop.setEnabled(True)
             self.progress.setValue(0)
+            self.lbl_speed.setText("")
         else:
             has_selection = bool(self.current_game_path)
             self.btn_gen.setEnabled(has_selection)
             self.btn_ver.setEnabled(has_selection)
+            self.btn_quick.setEnabled(has_selection)
+            self.btn_triage.setEnabled(has_selection)
+            self.cmb_triage.setEnabled(True)
+            self.btn_update.setEnabled(has_selection)
             self.btn_sum.setEnabled(has_selection)
-            self.chk_errors_only.setEnabled(True)
+            self.cmb_workers.setEnabled(True)
+            self.cmb_io.setEnabled(True)
+            self.cmb_algorithm.setEnabled(True)
+            self.btn_bench.setEnabled(True)
+            self.chk_full_rehash.setEnabled(True)
+            self.chk_blocks.setEnabled(True)
             self.btn_lib.setEnabled(True)
+            self.btn_verify_all.setEnabled(bool(self.library_path))
+            self.btn_gen_missing.setEnabled(bool(self.library_path))
             self.game_list.setEnabled(True)
             self.btn_stop.setEnabled(False)
 
-    def action_generate(self):
+    def engine_options(self):
+        # HashEngine settings picked in the UI, shared by single-game and library runs
+        return {
+            "workers": self.cmb_workers.currentData(),
+            "use_cache": not self.chk_full_rehash.isChecked(),
+            "make_blocks": self.chk_blocks.isChecked(),
+            "algorithm": self.cmb_algorithm.currentData(),
+            "io_backend": self.cmb_io.currentData(),
+            # A full rehash still shares digests within the run, not from earlier ones
+            "content": self.content_cache if not self.chk_full_rehash.isChecked() else self.content_cache.fresh(),
+        }
+
+    def create_worker(self, mode, md5_path=None, resume=False, **overrides):
+        game_name = os.path.basename(self.current_game_path)
+        cache_path = cache_path_for(self.checksum_dir, game_name)
+        worker = HashWorker(self.current_game_path, mode, md5_path,
+                            cache_path=cache_path,
+                            block_path=blocks_path_for(self.checksum_dir, game_name),
+                            damage_path=damage_path_for(self.checksum_dir, game_name),
+                            journal_path=journal_path_for(self.checksum_dir, game_name),
+                            resume=resume,
+                            **{**self.engine_options(), **self.take_changes(mode), **overrides})
+        worker.speed_update.connect(self.update_speed)
+        return worker
+
+    def set_game_status(self, game_name, state, detail):
+        item = self.game_items.get(game_name)
+        if item is None: return
+        icon, color = GAME_STATES[state]
+        item.setText(f"{game_name}   {icon} {detail}".rstrip())
+        item.setForeground(QColor(color))
+
+    def action_library(self, mode):
+        self.toggle_controls(True)
+        self.log_model.clear()
+        for game_name in self.game_items:
+            # Drop the status of the previous library run
+            self.game_items[game_name].setText(game_name)
+            self.game_items[game_name].setForeground(QColor("#E0E0E0"))
+        self.log_message("Verifying every game with a local hash..." if mode == "verify"
+                         else "Creating hashes for every game without one...")
+        self.worker = LibraryWorker(self.library_path, mode, self.checksum_dir, self.watcher, **self.engine_options())
+        self.worker.game_status.connect(self.set_game_status)
+        self.worker.progress_update.connect(self.progress.setValue)
+        self.worker.log_batch.connect(self.append_log_batch)
+        self.worker.finished_signal.connect(self.on_library_finished)
+        self.worker.start()
+
+    def update_speed(self, speed):
+        text = (f"{format_bytes(speed['bytes_done'])} / {format_bytes(speed['bytes_total'])}"
+                f"  ·  {speed['files_done']}/{speed['files_total']} files"
+                f"  ·  {speed['mb_per_s']:.1f} MB/s")
+        if speed["eta"] >= 0 and speed["bytes_done"] < speed["bytes_total"]:
+            text += f"  ·  ETA {format_duration(speed['eta'])}"
+        self.lbl_speed.setText(text)
+
+    def save_content_cache(self):
+        try:
+            self.content_cache.save()
+        except OSError as e:
+            self.log_message(f"Could not save the shared hash cache: {e}", LogStatus.WARNING)
+
+    def dedupe_lines(self, stats):
+        if not stats.get("deduped"): return []
+        return [(f"🔗 Hardlinked copies reused: {stats['deduped']} files, "
+                 f"{format_bytes(stats['dedupe_bytes'])} not read again", "#4FC3F7")]
+
+    def timing_lines(self, timing):
+        lines = [(f"⏱️ Scan: {timing['scan_s']:.1f}s  ·  Hash: {timing['hash_s']:.1f}s"
+                  f"  ·  {format_bytes(timing['bytes_hashed'])} read at {timing['mb_per_s']:.1f} MB/s"
+                  f"  ·  I/O: {timing['io']}", "#90A4AE")]
+        busy = timing["read_s"] + timing["digest_s"]
+        if busy > 0:
+            # Summed over all worker threads
+            lines.append((f"💽 Waiting on disk: {timing['read_s'] / busy:.0%}  ·  "
+                          f"🧮 Hashing: {timing['digest_s'] / busy:.0%}", "#90A4AE"))
+        for rel_path, elapsed, size in timing["slowest"][:3]:
+            lines.append((f"🐢 Slow: {rel_path} ({elapsed:.1f}s, {format_bytes(size)})", "#90A4AE"))
+        return lines
+
+    def action_generate(self, resume=False, **overrides):
         self.toggle_controls(True)
-        self.log.clear()
-        self.worker = HashWorker(self.current_game_path, "generate")
+        self.log_model.clear()
+        game_name = os.path.basename(self.current_game_path)
+        algorithm = overrides.get("algorithm") or self.cmb_algorithm.currentData()
+        md5_path = manifest_path_for(self.checksum_dir, game_name, algorithm)
+        self.worker = self.create_worker("generate", md5_path, resume=resume, **overrides)
         self.worker.progress_update.connect(self.progress.setValue)
-        self.worker.log_update.connect(lambda m, c: self.log.append(f'<span style="color:{c}">{m}</span>'))
+        self.worker.log_batch.connect(self.append_log_batch)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.start()
 
-    def run_verification(self, md5_path):
-        self.all_messages = []
-        
+    def run_verification(self, md5_path, mode="verify", resume=False, **overrides):
         self.toggle_controls(True)
-        self.log.clear()
+        self.log_model.clear()
         
-        self.worker = HashWorker(self.current_game_path, "verify", md5_path)
+        self.worker = self.create_worker(mode, md5_path, resume=resume, **overrides)
         self.worker.progress_update.connect(self.progress.setValue)
 
-        self.worker.log_update.connect(self.handle_log_filtering)
+        self.worker.log_batch.connect(self.append_log_batch)
         self.worker.finished_signal.connect(self.on_finished)
 
         self.worker.start()
 
     def action_verify(self):
         game_name = os.path.basename(self.current_game_path)
-        md5_path = os.path.join(self.checksum_dir, f"{game_name}.md5")
+        md5_path = find_manifest(self.checksum_dir, game_name)
         self.run_verification(md5_path)
 
+    def action_quick_check(self):
+        game_name = os.path.basename(self.current_game_path)
+        md5_path = find_manifest(self.checksum_dir, game_name)
+        self.run_verification(md5_path, "quick")
+
+    def action_triage(self):
+        game_name = os.path.basename(self.current_game_path)
+        md5_path = find_manifest(self.checksum_dir, game_name)
+        max_failures, time_budget = self.cmb_triage.currentData()
+        self.run_verification(md5_path, "triage", max_failures=max_failures, time_budget=time_budget)
+
+    def action_update(self):
+        game_name = os.path.basename(self.current_game_path)
+        local_path = find_manifest(self.checksum_dir, game_name)
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Updated Hash File", self.checksum_dir, HASH_FILE_FILTER)
+        if not file_path: return
+        if os.path.abspath(file_path) == os.path.abspath(local_path):
+            QMessageBox.information(self, "Same Hash File", "That's the local hash. Pick the hash file of the updated game.")
+            return
+        self.run_verification(file_path, "delta", base_manifest=local_path)
+
+    def action_recheck(self):
+        self.run_verification(None, "recheck")
+
+    def action_resume(self):
+        game_name = os.path.basename(self.current_game_path)
+        journal, _ = read_journal(journal_path_for(self.checksum_dir, game_name), header_only=True)
+        if journal is None:
+            QMessageBox.information(self, "Nothing to Resume", "There is no stopped run for this game.")
+        elif journal["mode"] == "generate":
+            # The manifest has to be finished with the hash it was started with
+            self.action_generate(resume=True, algorithm=journal["algorithm"])
+        else:
+            # Also covers a verify against a hash picked with Select Hash
+            self.run_verification(journal["manifest"], resume=True)
+
+    def action_benchmark(self):
+        self.btn_bench.setEnabled(False)
+        self.log_message("Benchmarking hash algorithms (64 MB in memory each)...")
+        if self.current_game_path:
+            self.log_message("Then reading the largest file of this game with each I/O mode...")
+        self.bench_worker = BenchmarkWorker(self.current_game_path)
+        self.bench_worker.finished_signal.connect(self.on_benchmark_finished)
+        self.bench_worker.start()
+
+    def benchmark_lines(self, title, results, labels):
+        fastest = max(results.values()) or 1
+        entries = [(LogStatus.SUMMARY, title, "white")]
+        for name, mb_per_s in sorted(results.items(), key=lambda item: -item[1]):
+            bar = "█" * max(1, int(mb_per_s / fastest * 20))
+            entries.append((LogStatus.SUMMARY, f"   {labels.get(name, name):<14} {mb_per_s:>8.0f} MB/s  {bar}", "#4FC3F7"))
+        return entries
+
+    def on_benchmark_finished(self, results):
+        labels = {name: info[3] for name, info in ALGORITHMS.items()}
+        entries = self.benchmark_lines("📈 Hash speed on this CPU (one thread):", results["hash"], labels)
+        if "io" in results:
+            rel_path, size = results["io_file"]
+            entries += self.benchmark_lines(f"💾 Read speed of {rel_path} ({format_bytes(size)}, cold cache where possible):",
+                                            results["io"], {})
+        self.append_log_batch(entries)
+        self.btn_bench.setEnabled(not (self.worker and self.worker.isRunning()))
+
     def load_external_hash(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Master Hash File", "", "Hash Files (*.md5)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Master Hash File", "", HASH_FILE_FILTER)
         if file_path:
             self.run_verification(file_path)
 
     def stop_worker(self):
         if self.worker: 
             self.worker.stop()
-            self.log.append("<span style='color:orange'>Stopping worker...</span>")
+            self.log_message("Stopping worker...", LogStatus.WARNING)
+
+    def on_library_finished(self, results):
+        if "error" in results:
+            self.log_message(f"Could not list library: {results['error']}", LogStatus.ERROR)
+            self.toggle_controls(False)
+            return
+        games = results["games"]
+        states = {}
+        for game_name, stats in games.items():
+            state, detail = game_result(results["mode"], stats)
+            self.set_game_status(game_name, state, detail)
+            self.record_result(game_name, results["mode"], stats)
+            states.setdefault(state, []).append(game_name)
+        count = lambda state: len(states.get(state, []))
+        header = (f"📊 LIBRARY {'VERIFY' if results['mode'] == 'verify' else 'HASH'} SUMMARY: "
+                  f"{len(games)} games on {results['devices']} drive(s) in {format_duration(results['elapsed'])}")
+        summary_lines = [("", "white"), ("-"*30, "white"), (header, "white")]
+        if results["mode"] == "verify":
+            totals = {key: sum(stats.get(key, 0) for stats in games.values())
+                      for key in ("ok", "bad", "missing", "extra", "cached")}
+            summary_lines += [
+                (f"✅ Healthy games: {count('ok')}", "#66BB6A"),
+                (f"⚠️ Games with problems: {count('problems')}", "#FFA726"),
+                *((f"   ↳ {game_name}", "#FFA726") for game_name in sorted(states.get("problems", []))),
+                (f"➖ No local hash (skipped): {results['skipped']}", "#90A4AE"),
+                (f"📄 Files: {totals['ok']} healthy, {totals['bad']} corrupt, {totals['missing']} missing, "
+                 f"{totals['extra']} extra ({totals['cached']} unchanged, not re-read)", "#90A4AE"),
+            ]
+        else:
+            summary_lines += [
+                (f"🛠️ Hashes created: {count('created')}", "#66BB6A"),
+                (f"➖ Already had a hash: {results['skipped']}", "#90A4AE"),
+            ]
+        summary_lines += self.dedupe_lines({key: sum(stats.get(key, 0) for stats in games.values())
+                                            for key in ("deduped", "dedupe_bytes")})
+        if count("error"):
+            summary_lines.append((f"❌ Couldn't be checked: {', '.join(sorted(states['error']))}", "#FF5252"))
+        if count("stopped"):
+            summary_lines.append((f"⏹️ Stopped: {count('stopped')}", "#90A4AE"))
+        summary_lines.append(("-"*30, "white"))
+        self.append_log_batch([(LogStatus.SUMMARY, msg, color) for msg, color in summary_lines])
+        self.save_content_cache()
+        self.save_library_index()
+
+        if self.worker.is_running:
+            if count("problems") or count("error"):
+                QMessageBox.warning(self, "Library Check Complete",
+                                    f"{count('problems') + count('error')} games need attention. Check the log for details.")
+            elif results["mode"] == "generate":
+                QMessageBox.information(self, "Library Check Complete", f"Hashes created for {len(games)} games.")
+            else:
+                QMessageBox.information(self, "Library Check Complete", f"All {len(games)} games are fine.")
+        self.toggle_controls(False)
+        self.update_game_selection()
+
+    def offer_adopt(self, stats):
+        # Later checks should use the updated hash, not the one from before the patch
+        local_path = self.worker.engine.base_manifest
+        answer = QMessageBox.question(self, "Update Verified",
+                                      "Everything the update touched checks out.\n\n"
+                                      "Replace the local hash with the updated one?")
+        if answer != QMessageBox.StandardButton.Yes: return
+        try:
+            adopt_manifest(self.worker.engine.md5_file_path, local_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not replace the local hash: {e}")
+            return
+        game_name = os.path.basename(self.current_game_path)
+        self.log_message(f"Local hash for {game_name} replaced with the updated one.", LogStatus.SUCCESS)
+        self.record_result(game_name, "verify", stats)
+        self.show_index_entry(game_name)
+        self.save_library_index()
 
     def on_finished(self, stats):
-        if self.worker.mode == "generate" and "data" in stats:
+        if self.taken_changes and self.watcher and (not self.worker.is_running or "error" in stats):
+            # That run never got to check them, keep them for the next one
+            self.watcher.give_back(*self.taken_changes)
+        self.taken_changes = None
+        self.save_content_cache()
+        game_name = os.path.basename(self.current_game_path)
+        if self.worker.engine.md5_file_path == find_manifest(self.checksum_dir, game_name):
+            # Runs against a hash picked with Select Hash don't say much about the local one
+            self.record_result(game_name, self.worker.mode, {**stats, "completed": self.worker.is_running})
+            self.show_index_entry(game_name)
+            self.save_library_index()
+
+        if self.worker.mode in ("generate", "verify") and not self.worker.is_running:
+            game_name = os.path.basename(self.current_game_path)
+            if os.path.exists(journal_path_for(self.checksum_dir, game_name)):
+                self.log_message("Stopped. Progress was saved, use Resume to continue where this run left off.",
+                                 LogStatus.WARNING)
+
+        if self.worker.mode == "generate" and "error" not in stats:
             if self.worker.is_running:
+                # The engine already wrote the manifest
                 game_name = os.path.basename(self.current_game_path)
-                save_path = os.path.join(self.checksum_dir, f"{game_name}.md5")
-                with open(save_path, "w", encoding="utf-8") as f:
-                    f.write("\n".join(stats["data"]))
-                self.log.append(f"<br><b style='color:#00E676'>Hash created for {game_name}</b>")
+                self.append_log_batch([(LogStatus.INFO, "", None),
+                                       (LogStatus.SUCCESS, f"Hash created for {game_name}", None),
+                                       *((LogStatus.INFO, msg, color)
+                                         for msg, color in self.dedupe_lines(stats) + self.timing_lines(stats["timing"]))])
         
-        if self.worker.mode == "verify" and self.worker.is_running:
+        if self.worker.mode in ("verify", "quick", "triage", "delta", "recheck") and self.worker.is_running and "error" not in stats:
             # 1. Define the summary lines
-            summary_lines = [
-                ("<br>" + "-"*30, "white"),
-                ("<b>📊 VERIFICATION SUMMARY</b>", "white"),
-                (f"✅ Healthy: {stats['ok']}", "#66BB6A"),
-                (f"⚠️ Corrupt: {stats['bad']}", "#FFA726"),
-                (f"❌ Missing: {stats['missing']}", "#FF5252"),
-                (f"➕ Extra Files: {stats.get('extra', 0)}", "#BA68C8"),
-                ("-"*30 + "<br>", "white")
-            ]
+            corrupt_line = f"⚠️ Corrupt: {stats['bad']}"
+            if stats["size_mismatch"]:
+                corrupt_line += f" ({stats['size_mismatch']} with the wrong size)"
+            damage_lines = []
+            if stats.get("damaged_bytes"):
+                damage_lines.append((f"🧩 Damaged data: {format_bytes(stats['damaged_bytes'])}"
+                                     " (use Recheck Damaged after repairing)", "#FFA726"))
+            if self.worker.mode == "recheck":
+                summary_lines = [
+                    ("", "white"),
+                    ("-"*30, "white"),
+                    ("📊 RECHECK SUMMARY (damaged blocks only)", "white"),
+                    (f"✅ Repaired: {stats['ok']}", "#66BB6A"),
+                    (f"⚠️ Still damaged: {stats['bad']}", "#FFA726"),
+                    (f"❌ Missing: {stats['missing']}", "#FF5252"),
+                    *damage_lines,
+                    ("-"*30, "white")
+                ]
+            elif self.worker.mode == "quick":
+                summary_lines = [
+                    ("", "white"),
+                    ("-"*30, "white"),
+                    ("📊 QUICK CHECK SUMMARY (sizes only)", "white"),
+                    (corrupt_line, "#FFA726"),
+                    (f"❌ Missing: {stats['missing']}", "#FF5252"),
+                    (f"➕ Extra Files: {stats.get('extra', 0)}", "#BA68C8"),
+                    (f"❔ Right size, not hash-checked: {stats['unverified']}", "#90A4AE"),
+                    (f"⏱️ Scan: {stats['timing']['scan_s']:.1f}s", "#90A4AE"),
+                    ("-"*30, "white")
+                ]
+            elif self.worker.mode == "delta":
+                summary_lines = [
+                    ("", "white"),
+                    ("-"*30, "white"),
+                    ("📊 UPDATE SUMMARY (only what the update touched)", "white"),
+                    (f"🆕 Changed: {stats['changed']}  ·  Added: {stats['added']}  ·  Removed: {stats['removed']}", "white"),
+                    (f"✅ Healthy: {stats['ok']}", "#66BB6A"),
+                    (corrupt_line, "#FFA726"),
+                    (f"❌ Missing: {stats['missing']}", "#FF5252"),
+                    (f"➕ Left over (removed by the update): {stats['extra']}", "#BA68C8"),
+                    (f"⚡ Unchanged by the update (last result kept): {stats['carried']}", "#4FC3F7"),
+                    *self.dedupe_lines(stats),
+                    *self.timing_lines(stats["timing"]),
+                    ("-"*30, "white")
+                ]
+            elif self.worker.mode == "triage":
+                suspects = stats["suspects"]
+                summary_lines = [
+                    ("", "white"),
+                    ("-"*30, "white"),
+                    ("🚑 TRIAGE SUMMARY (likeliest culprits first)", "white"),
+                    *((f"{index}. {'❌' if suspect['status'] == 'missing' else '⚠️'} {suspect['path']} ({suspect['reason']})",
+                       "#FF5252" if suspect["status"] == "missing" else "#FFA726")
+                      for index, suspect in enumerate(suspects[:20], 1)),
+                    *([(f"   ... and {len(suspects) - 20} more", "#FFA726")] if len(suspects) > 20 else []),
+                    (f"✅ Healthy: {stats['ok']}", "#66BB6A"),
+                    *([(f"⏹️ Not checked (stopped early): {stats['unchecked']}", "#90A4AE")] if stats["unchecked"] else []),
+                    *self.timing_lines(stats["timing"]),
+                    ("-"*30, "white")
+                ]
+            else:
+                summary_lines = [
+                    ("", "white"),
+                    ("-"*30, "white"),
+                    (f"📊 VERIFICATION SUMMARY ({ALGORITHMS[stats['algorithm']][3]})", "white"),
+                    (f"✅ Healthy: {stats['ok']}", "#66BB6A"),
+                    (corrupt_line, "#FFA726"),
+                    (f"❌ Missing: {stats['missing']}", "#FF5252"),
+                    (f"➕ Extra Files: {stats.get('extra', 0)}", "#BA68C8"),
+                    (f"⚡ Unchanged (not re-read): {stats.get('cached', 0)}", "#4FC3F7"),
+                    *([(f"👁️ Changed since the last check: {stats['tracked']} (no full folder scan needed)", "#4FC3F7")]
+                      if "tracked" in stats else []),
+                    *([(f"⏯️ Resumed from the stopped run: {stats['resumed']}", "#4FC3F7")] if stats.get("resumed") else []),
+                    *damage_lines,
+                    *self.dedupe_lines(stats),
+                    *self.timing_lines(stats["timing"]),
+                    ("-"*30, "white")
+                ]
             
-            # 2. Add them to memory AND print them
-            for msg, color in summary_lines:
-                self.all_messages.append((msg, color))
-                self.log.append(f'<span style="color:{color}">{msg}</span>')
+            # 2. Add them to the log (summary rows survive "Errors Only")
+            self.append_log_batch([(LogStatus.SUMMARY, msg, color) for msg, color in summary_lines])
             
             # 3. Show Pop-up
             total_errors = stats['bad'] + stats['missing']
             if total_errors > 0:
                 QMessageBox.warning(self, "Verification Complete", 
                                     f"Found {total_errors} issues! Check the log for details.")
+            elif self.worker.mode == "recheck":
+                QMessageBox.information(self, "Recheck Complete", "All previously damaged blocks now match.")
+            elif self.worker.mode == "triage" and stats["unchecked"]:
+                QMessageBox.information(self, "Triage Complete",
+                                        f"Nothing wrong so far, but {stats['unchecked']} files weren't checked. "
+                                        "Run a full verify to be sure.")
+            elif self.worker.mode == "quick":
+                QMessageBox.information(self, "Quick Check Complete",
+                                        "No missing or resized files. Run a full verify to check file contents.")
+            elif self.worker.mode == "delta":
+                self.offer_adopt(stats)
             else:
                 QMessageBox.information(self, "Success", "All files verified successfully!")
 
@@ -0,0 +1,289 @@
+# Game Integrity Tool - benchmark harness
+# Builds a reproducible fake game folder in temp space, then times each stage
+# of the engine separately so changes can be compared run against run:
+#
+#   python integrity_bench.py                          (mixed profile)
+#   python integrity_bench.py --profile tiny --scale 2
+#   python integrity_bench.py --profile archives --io mmap --label "mmap test"
+#
+# Profiles:
+#   tiny      tens of thousands of small config files
+#   archives  a handful of multi-hundred-MB archives
+#   deep      thousands of files spread over very deep directory trees
+#   mixed     a bit of everything, roughly what a real game looks like
+#
+# After the manifest is generated, some files are corrupted (one byte flipped,
+# same size), deleted, and added, so verify has real work to find.
+#
+# Timed stages: generate (scan + hash everything), scan, manifest parse,
+# reconcile, and verify (hash everything again, cache off). Every stage
+# reports seconds, files/s and MB/s (for parse, MB/s of manifest text). Each run is appended to the results file
+# (default bench_results.json) with the git commit, so runs can be compared.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from integrity_engine import (HashEngine, ALGORITHMS, IO_BACKENDS, scan_folder, read_manifest, reconcile,
+                              manifest_path_for, drop_from_cache)
+
+# counts are scaled by --scale, sizes are in bytes
+PROFILES = {
+    "tiny": {"small": 20000, "medium": 0, "archives": 0, "archive_size": 0, "depth": 4},
+    "archives": {"small": 50, "medium": 0, "archives": 4, "archive_size": 512 * 1024 * 1024, "depth": 2},
+    "deep": {"small": 5000, "medium": 50, "archives": 0, "archive_size": 0, "depth": 24},
+    "mixed": {"small": 5000, "medium": 300, "archives": 2, "archive_size": 256 * 1024 * 1024, "depth": 8},
+}
+SMALL_SIZES = (100, 8 * 1024)
+MEDIUM_SIZES = (64 * 1024, 4 * 1024 * 1024)
+SMALL_EXTENSIONS = ("ini", "cfg", "json", "xml", "lua", "txt")
+MEDIUM_EXTENSIONS = ("dll", "exe", "dds", "wav")
+ARCHIVE_EXTENSIONS = ("pak", "bsa", "bin")
+WRITE_CHUNK = 1024 * 1024
+
+
+def log(text):
+    sys.stderr.write(text + "\n")
+    sys.stderr.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="integrity_bench",
+        description="Time the integrity engine on a synthetic game folder.")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default="mixed")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply file counts by this (default: 1)")
+    parser.add_argument("--archive-mb", type=int, help="size of each archive in MB (default: from the profile)")
+    parser.add_argument("--seed", type=int, default=1, help="same seed, same tree (default: %(default)s)")
+    parser.add_argument("--corrupt", type=int, default=5, help="files to corrupt after generating (default: 5)")
+    parser.add_argument("--missing", type=int, default=5, help="files to delete after generating (default: 5)")
+    parser.add_argument("--extra", type=int, default=5, help="files to add after generating (default: 5)")
+    parser.add_argument("--workers", type=int, default=0, help="files hashed at once (default: auto)")
+    parser.add_argument("--io", choices=IO_BACKENDS, default="auto", help="read backend (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=0, metavar="KB", help="read size in KB (default: adaptive)")
+    parser.add_argument("--algorithm", choices=tuple(ALGORITHMS), default="md5")
+    parser.add_argument("--cold", action="store_true",
+                        help="drop every file from the page cache before each hashing stage (Linux)")
+    parser.add_argument("--dir", help="build the tree here instead of a new temp folder")
+    parser.add_argument("--keep", action="store_true", help="don't delete the tree afterwards")
+    parser.add_argument("--label", default="", help="note stored with the results")
+    parser.add_argument("--output", default="bench_results.json",
+                        help="results file, each run is appended (default: %(default)s)")
+    return parser
+
+
+# --- TREE GENERATOR ---
+def make_dirs(rng, count, depth):
+    # One chain down to full depth so the profile really is that deep, the
+    # rest hang off random existing folders
+    dirs = [""]
+    for level in range(1, depth + 1):
+        dirs.append(os.path.join(dirs[-1], f"level{level}"))
+    while len(dirs) < count:
+        parent = rng.choice(dirs)
+        parent_depth = parent.count(os.sep) + 1 if parent else 0
+        if parent_depth >= depth: continue
+        dirs.append(os.path.join(parent, f"dir{len(dirs)}"))
+    return dirs
+
+def write_random(path, rng, size):
+    with open(path, "wb") as f:
+        while size > 0:
+            take = min(size, WRITE_CHUNK)
+            f.write(rng.randbytes(take))
+            size -= take
+
+def build_tree(root, profile, scale, seed):
+    # Returns [(rel_path, size), ...]. The same seed always gives the same
+    # paths, sizes and bytes.
+    rng = random.Random(seed)
+    small = int(profile["small"] * scale)
+    medium = int(profile["medium"] * scale)
+    archives = max(0, round(profile["archives"] * scale)) if profile["archives"] else 0
+    dirs = make_dirs(rng, max(1, (small + medium) // 20), profile["depth"])
+    plan = []
+    for index in range(small):
+        plan.append((f"config_{index}.{rng.choice(SMALL_EXTENSIONS)}", rng.randint(*SMALL_SIZES)))
+    for index in range(medium):
+        plan.append((f"module_{index}.{rng.choice(MEDIUM_EXTENSIONS)}", rng.randint(*MEDIUM_SIZES)))
+    files = []
+    for name, size in plan:
+        files.append((os.path.join(rng.choice(dirs), name), size))
+    for index in range(archives):
+        files.append((f"data_{index}.{rng.choice(ARCHIVE_EXTENSIONS)}", profile["archive_size"]))
+
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+    for rel_path, size in files:
+        write_random(os.path.join(root, rel_path), rng, size)
+    return files
+
+def inject_damage(root, files, rng, corrupt, missing, extra):
+    # Corruption keeps the size, so it can only be found by hashing
+    picked = rng.sample(files, min(len(files), corrupt + missing))
+    damaged = {"corrupt": [], "missing": [], "extra": []}
+    for rel_path, size in picked[:corrupt]:
+        if size == 0: continue
+        with open(os.path.join(root, rel_path), "r+b") as f:
+            f.seek(size // 2)
+            byte = f.read(1)
+            f.seek(size // 2)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        damaged["corrupt"].append(rel_path)
+    for rel_path, _ in picked[corrupt:]:
+        os.remove(os.path.join(root, rel_path))
+        damaged["missing"].append(rel_path)
+    for index in range(extra):
+        rel_path = f"extra_{index}.dat"
+        write_random(os.path.join(root, rel_path), rng, rng.randint(*SMALL_SIZES))
+        damaged["extra"].append(rel_path)
+    return damaged
+
+
+# --- STAGES ---
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else 0.0
+
+def stage(seconds, files, size):
+    return {"seconds": round(seconds, 4), "files": files, "bytes": size,
+            "files_per_s": rate(files, seconds), "mb_per_s": rate(size / (1024 * 1024), seconds)}
+
+def drop_tree_from_cache(root, files):
+    for rel_path in files:
+        try:
+            with open(os.path.join(root, rel_path), "rb") as f:
+                drop_from_cache(f.fileno())
+        except OSError:
+            pass
+
+def run_bench(args, root, checksum_dir):
+    profile = dict(PROFILES[args.profile])
+    if args.archive_mb is not None:
+        profile["archive_size"] = args.archive_mb * 1024 * 1024
+    engine_options = {"workers": args.workers, "io_backend": args.io, "chunk_size": args.chunk_size * 1024,
+                      "algorithm": args.algorithm}
+
+    log(f"Building '{args.profile}' tree in {root} ...")
+    start = time.perf_counter()
+    files = build_tree(root, profile, args.scale, args.seed)
+    tree_bytes = sum(size for _, size in files)
+    log(f"  {len(files)} files, {tree_bytes / (1024 * 1024):.1f} MB in {time.perf_counter() - start:.1f}s")
+    stages = {}
+
+    # Generate: scan + hash everything
+    if args.cold:
+        drop_tree_from_cache(root, [rel_path for rel_path, _ in files])
+    log("Generating manifest ...")
+    manifest = manifest_path_for(checksum_dir, "bench", args.algorithm)
+    start = time.perf_counter()
+    stats = HashEngine(root, "generate", manifest, **engine_options).run()
+    stages["generate"] = stage(time.perf_counter() - start, len(files), tree_bytes)
+    stages["generate"]["timing"] = stats["timing"]
+
+    damaged = inject_damage(root, files, random.Random(args.seed + 1), args.corrupt, args.missing, args.extra)
+
+    # Scan, parse and reconcile on their own
+    start = time.perf_counter()
+    current_files = scan_folder(root)
+    # Scan and reconcile never read file contents, so their MB/s stays 0
+    stages["scan"] = stage(time.perf_counter() - start, len(current_files), 0)
+
+    start = time.perf_counter()
+    master_list = read_manifest(manifest, {})
+    stages["parse"] = stage(time.perf_counter() - start, len(master_list), os.path.getsize(manifest))
+
+    start = time.perf_counter()
+    matched, missing, extra = reconcile(master_list, current_files)
+    stages["reconcile"] = stage(time.perf_counter() - start, len(master_list), 0)
+
+    # Verify: hash everything again, no cache
+    if args.cold:
+        drop_tree_from_cache(root, current_files)
+    log("Verifying ...")
+    start = time.perf_counter()
+    stats = HashEngine(root, "verify", manifest, **engine_options).run()
+    verify_bytes = sum(current_files[rel_path][0] for rel_path in matched)
+    stages["verify"] = stage(time.perf_counter() - start, len(matched), verify_bytes)
+    stages["verify"]["timing"] = stats["timing"]
+
+    # The numbers only mean something if verify found exactly what we broke
+    found = {"corrupt": stats["bad"], "missing": stats["missing"], "extra": stats["extra"]}
+    expected = {key: len(paths) for key, paths in damaged.items()}
+    if found != expected:
+        log(f"WARNING: verify found {found}, expected {expected}")
+
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"profile": args.profile, "scale": args.scale, "seed": args.seed, "cold": args.cold,
+                   "archive_size": profile["archive_size"], **engine_options},
+        "tree": {"files": len(files), "bytes": tree_bytes},
+        "damage": {"expected": expected, "found": found, "correct": found == expected},
+        "stages": stages,
+    }
+
+
+# --- RESULTS ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def save_result(output, result):
+    try:
+        with open(output, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {"runs": []}
+    data.setdefault("runs", []).append(result)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, output)
+
+def print_table(result):
+    print(f"{'stage':<10} {'seconds':>9} {'files':>9} {'files/s':>11} {'MB/s':>9}")
+    for name, numbers in result["stages"].items():
+        print(f"{name:<10} {numbers['seconds']:>9.3f} {numbers['files']:>9} "
+              f"{numbers['files_per_s']:>11.0f} {numbers['mb_per_s']:>9.1f}")
+    if not result["damage"]["correct"]:
+        print(f"damage found {result['damage']['found']}, expected {result['damage']['expected']}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="integrity-bench-", dir=args.dir)
+    else:
+        work_dir = tempfile.mkdtemp(prefix="integrity-bench-")
+    root = os.path.join(work_dir, "game")
+    checksum_dir = os.path.join(work_dir, "Checksums")
+    os.makedirs(checksum_dir)
+    try:
+        result = run_bench(args, root, checksum_dir)
+    finally:
+        if args.keep:
+            log(f"Tree kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    save_result(args.output, result)
+    print_table(result)
+    log(f"Results appended to {args.output}")
+    return 0 if result["damage"]["correct"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
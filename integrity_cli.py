@@ -0,0 +1,268 @@
+# Game Integrity Tool - command line
+# Runs the same engine as the GUI without needing PyQt6, e.g. from cron or SSH:
+#
+#   python integrity_cli.py verify "D:/Games/Fallout 3"
+#   python integrity_cli.py verify --library "D:/Games"
+#   python integrity_cli.py quick --library "D:/Games"     (sizes only, no hashing)
+#   python integrity_cli.py verify --library --parallel "D:/Games" "E:/Games"  (one game per drive at once)
+#   python integrity_cli.py generate --blocks "D:/Games/Fallout 3"
+#   python integrity_cli.py recheck "D:/Games/Fallout 3"    (only blocks a verify found damaged)
+#   python integrity_cli.py triage --max-failures 1 "D:/Games/Fallout 3"  (likeliest culprits first, stop at the first)
+#   python integrity_cli.py verify --resume "D:/Games/Fallout 3"  (after Ctrl+C, skip files already done)
+#   python integrity_cli.py delta --manifest new.md5 "D:/Games/Fallout 3"  (after a patch, only what it changed)
+#   python integrity_cli.py generate --algorithm sha256 "D:/Games/Fallout 3"
+#   python integrity_cli.py bench                            (hash speed of each algorithm)
+#   python integrity_cli.py bench "D:/Games/Fallout 3"       (also read speed of each I/O backend)
+#
+# Results go to stdout as JSON lines, one object per line:
+#   {"type": "file", "game": ..., "status": "corrupt", "path": ...}
+#   {"type": "message", "game": ..., "level": "error", "text": ...}
+#   {"type": "skipped", "game": ..., "reason": ...}
+#   {"type": "summary", "game": ..., "mode": ..., "ok": ..., "bad": ..., ...}
+#   {"type": "benchmark", "algorithm": ..., "mb_per_s": ...}
+#   {"type": "io_benchmark", "path": ..., "backend": ..., "mb_per_s": ...}
+#
+# Exit codes:
+#   0   everything checked out (or all manifests were written)
+#   1   corrupt or missing files were found
+#   2   a game couldn't be checked (bad path, missing or unreadable manifest)
+#   130 stopped with Ctrl+C
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+
+from integrity_engine import (HashEngine, LogStatus, ALGORITHMS, IO_BACKENDS, default_checksum_dir,
+                              manifest_path_for, find_manifest, cache_path_for, blocks_path_for,
+                              damage_path_for, journal_path_for, scan_folder, benchmark_algorithms,
+                              benchmark_io, list_games, LibraryScheduler, ContentCache, content_cache_path_for,
+                              adopt_manifest)
+
+EXIT_OK = 0
+EXIT_PROBLEMS = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+FILE_STATUSES = {LogStatus.HASHED, LogStatus.OK, LogStatus.CORRUPT, LogStatus.MISSING, LogStatus.EXTRA}
+# Only printed with --verbose, everything else always is
+QUIET_STATUSES = {LogStatus.HASHED, LogStatus.OK, LogStatus.INFO}
+
+# --parallel writes from several threads, keep each line whole
+emit_lock = threading.Lock()
+
+
+def emit(record):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with emit_lock:
+        sys.stdout.write(line)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="integrity_cli",
+        description="Generate or verify game file manifests without the GUI.")
+    parser.add_argument("command", choices=("generate", "verify", "quick", "triage", "delta", "recheck", "bench"),
+                        help="quick only compares file sizes against the manifest; "
+                             "triage checks missing files, executables/DLLs, recently modified and small "
+                             "files first and can stop early (see --max-failures/--time-budget); "
+                             "delta diffs the local manifest against an updated one (--manifest) and only "
+                             "reads files the update changed or added; "
+                             "recheck re-reads only the blocks the last verify found damaged; "
+                             "bench measures each hash algorithm in memory, and each I/O backend "
+                             "on the largest file of any paths given")
+    parser.add_argument("paths", nargs="*", help="game folder(s), or library folder(s) with --library")
+    parser.add_argument("--library", action="store_true",
+                        help="treat each path as a library and process every game folder inside it")
+    parser.add_argument("--manifest", help="manifest to read/write instead of Checksums/<game>.md5 (single game only)")
+    parser.add_argument("--algorithm", choices=tuple(ALGORITHMS), default="md5",
+                        help="generate: hash to use (default: %(default)s); verify detects it from the manifest")
+    parser.add_argument("--checksums", default=default_checksum_dir(),
+                        help="folder holding <game>.md5 manifests and caches (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=0, help="files hashed at once (default: auto)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="check several games at once: one per drive, drives side by side")
+    parser.add_argument("--resume", action="store_true",
+                        help="generate/verify: continue a run that was stopped, skipping files it already finished")
+    parser.add_argument("--full-rehash", action="store_true", help="ignore the cache and re-read every file")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor update the cache")
+    parser.add_argument("--blocks", action="store_true",
+                        help="generate: also write per-block hashes for large files")
+    parser.add_argument("--io", choices=IO_BACKENDS, default="auto",
+                        help="how files are read (default: %(default)s = readinto, mmap for huge files)")
+    parser.add_argument("--chunk-size", type=int, default=0, metavar="KB",
+                        help="read size in KB (default: adapts to each file's size)")
+    parser.add_argument("--keep-cache", action="store_true",
+                        help="leave big files in the OS page cache after hashing them")
+    parser.add_argument("--max-failures", type=int, default=0, metavar="N",
+                        help="triage: stop after N corrupt or missing files (default: check everything)")
+    parser.add_argument("--time-budget", type=float, default=0, metavar="SECONDS",
+                        help="triage: stop after this many seconds (default: no limit)")
+    parser.add_argument("--base", metavar="MANIFEST",
+                        help="delta: the manifest from before the update (default: Checksums/<game>.md5)")
+    parser.add_argument("--adopt", action="store_true",
+                        help="delta: if the update checks out, replace the local manifest with the new one")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print OK/HASHED files")
+    return parser
+
+
+def run_benchmarks(args):
+    for algorithm, mb_per_s in benchmark_algorithms().items():
+        emit({"type": "benchmark", "algorithm": algorithm, "mb_per_s": mb_per_s})
+    for path in args.paths:
+        if os.path.isdir(path):
+            files = scan_folder(path)
+            if not files:
+                emit({"type": "skipped", "game": None, "reason": "no files", "path": path})
+                continue
+            path = os.path.join(path, max(files, key=lambda rel_path: files[rel_path][0]))
+        for backend, mb_per_s in benchmark_io(path, args.chunk_size * 1024).items():
+            emit({"type": "io_benchmark", "path": path, "backend": backend, "mb_per_s": mb_per_s})
+    return EXIT_OK
+
+
+class CliRunner:
+    def __init__(self, args):
+        self.args = args
+        self.engines = set()
+        self.scheduler = None
+        self.interrupted = False
+        # Hardlinked files shared between games are only read once per library
+        self.content = None if args.no_cache else ContentCache(content_cache_path_for(args.checksums))
+        # --full-rehash re-reads them once, and still saves what it found
+        self.run_content = self.content.fresh() if self.content and args.full_rehash else self.content
+
+    def interrupt(self, signum, frame):
+        # Let the engines wind down cleanly so the caches still get saved
+        self.interrupted = True
+        if self.scheduler:
+            self.scheduler.stop()
+        for engine in list(self.engines):
+            engine.stop()
+
+    def run_game(self, game_path):
+        args = self.args
+        game_name = os.path.basename(os.path.normpath(game_path))
+        base = None
+        if args.command == "delta":
+            base = args.base or find_manifest(args.checksums, game_name)
+        if args.manifest:
+            manifest = args.manifest
+        elif args.command == "generate":
+            manifest = manifest_path_for(args.checksums, game_name, args.algorithm)
+        else:
+            manifest = find_manifest(args.checksums, game_name)
+
+        if not os.path.isdir(game_path):
+            emit({"type": "message", "game": game_name, "level": "error", "text": f"Not a folder: {game_path}"})
+            return EXIT_ERROR
+        if args.command in ("verify", "quick", "triage") and not os.path.exists(manifest):
+            emit({"type": "skipped", "game": game_name, "reason": "no manifest", "manifest": manifest})
+            # Only an error when the user pointed us at this exact game
+            return EXIT_OK if args.library else EXIT_ERROR
+        if base and not os.path.exists(base):
+            emit({"type": "skipped", "game": game_name, "reason": "no manifest", "manifest": base})
+            return EXIT_ERROR
+
+        def on_log(entries):
+            for status, text, _ in entries:
+                if status in QUIET_STATUSES and not args.verbose: continue
+                if status in FILE_STATUSES:
+                    emit({"type": "file", "game": game_name, "status": status.name.lower(), "path": text})
+                else:
+                    emit({"type": "message", "game": game_name, "level": status.name.lower(), "text": text})
+
+        cache_path = None if args.no_cache else cache_path_for(args.checksums, game_name)
+        engine = HashEngine(game_path, args.command, manifest, args.workers, cache_path,
+                                 use_cache=not args.full_rehash,
+                                 block_path=blocks_path_for(args.checksums, game_name),
+                                 damage_path=damage_path_for(args.checksums, game_name),
+                                 make_blocks=args.blocks, algorithm=args.algorithm,
+                                 io_backend=args.io, chunk_size=args.chunk_size * 1024,
+                                 drop_cache=not args.keep_cache,
+                                 journal_path=journal_path_for(args.checksums, game_name),
+                                 resume=args.resume, content=self.run_content,
+                                 max_failures=args.max_failures, time_budget=args.time_budget,
+                                 base_manifest=base, on_log=on_log)
+        self.engines.add(engine)
+        stats = engine.run()
+        completed = engine.is_running
+        self.engines.discard(engine)
+
+        emit({"type": "summary", "game": game_name, "mode": args.command, "path": game_path,
+              "manifest": manifest, "completed": completed, **stats})
+        sys.stdout.flush()
+
+        if "error" in stats:
+            return EXIT_ERROR
+        if stats["bad"] or stats["missing"]:
+            return EXIT_PROBLEMS
+        if args.adopt and completed and os.path.abspath(manifest) != os.path.abspath(base):
+            try:
+                adopt_manifest(manifest, base)
+            except OSError as e:
+                emit({"type": "message", "game": game_name, "level": "error", "text": f"Could not replace {base}: {e}"})
+                return EXIT_ERROR
+            emit({"type": "message", "game": game_name, "level": "success", "text": f"Replaced {base} with {manifest}"})
+        return EXIT_OK
+
+    def run(self):
+        args = self.args
+        if args.library:
+            games = []
+            for library_path in args.paths:
+                try:
+                    games.extend(list_games(library_path))
+                except OSError as e:
+                    emit({"type": "message", "game": None, "level": "error", "text": f"Could not list {library_path}: {e}"})
+                    return EXIT_ERROR
+        else:
+            games = args.paths
+        if args.command == "generate":
+            os.makedirs(args.checksums, exist_ok=True)
+
+        exit_code = EXIT_OK
+        if args.parallel:
+            self.scheduler = LibraryScheduler(games, self.run_game)
+            for game_path, result in self.scheduler.run().items():
+                if isinstance(result, dict):
+                    # run_game itself failed, the scheduler caught it
+                    emit({"type": "message", "game": os.path.basename(os.path.normpath(game_path)),
+                          "level": "error", "text": result["error"]})
+                    result = EXIT_ERROR
+                exit_code = max(exit_code, result)
+        else:
+            for game_path in games:
+                if self.interrupted: break
+                exit_code = max(exit_code, self.run_game(game_path))
+        if self.content:
+            try:
+                self.content.save()
+            except OSError as e:
+                emit({"type": "message", "game": None, "level": "warning", "text": f"Could not save content cache: {e}"})
+        return EXIT_INTERRUPTED if self.interrupted else exit_code
+
+
+def main(argv=None):
+    parser = build_parser()
+    # intermixed so options can sit between the command and the (optional) paths
+    args = parser.parse_intermixed_args(argv)
+    if args.command == "bench":
+        return run_benchmarks(args)
+    if not args.paths:
+        parser.error("at least one path is required")
+    if args.manifest and (args.library or len(args.paths) > 1):
+        parser.error("--manifest only works with a single game folder")
+    if args.command == "delta" and not args.manifest:
+        parser.error("delta needs the updated manifest as --manifest")
+    if args.adopt and args.command != "delta":
+        parser.error("--adopt only works with delta")
+
+    runner = CliRunner(args)
+    signal.signal(signal.SIGINT, runner.interrupt)
+    return runner.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2251 @@
+# Game Integrity Tool - hashing engine
+# Everything that generates or verifies manifests lives here, with no Qt
+# imports, so the GUI, the command line and scripts can share it.
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
+import os
+import re
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from enum import IntEnum
+# concurrent.futures and random are imported where they're used: the GUI
+# imports this module before its window can appear, and they aren't needed
+# until something is hashed.
+
+# --- SETTINGS ---
+def default_worker_count():
+    # Hashing is mostly disk bound and hashlib releases the GIL on large updates,
+    # so a handful of threads is enough to keep an NVMe drive busy.
+    return max(1, min(8, os.cpu_count() or 1))
+
+def default_checksum_dir():
+    # Correctly find path whether running as .py or .exe
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, "Checksums")
+
+def manifest_path_for(checksum_dir, game_name, algorithm="md5"):
+    return os.path.join(checksum_dir, game_name + ALGORITHMS[algorithm][1])
+
+def find_manifest(checksum_dir, game_name):
+    # The local manifest for a game, whatever algorithm it was made with.
+    # If there are several, the newest one wins. Falls back to the .md5 path.
+    newest, newest_time = manifest_path_for(checksum_dir, game_name), -1
+    for extension in MANIFEST_EXTENSIONS:
+        path = os.path.join(checksum_dir, game_name + extension)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        if mtime > newest_time:
+            newest, newest_time = path, mtime
+    return newest
+
+def cache_path_for(checksum_dir, game_name):
+    return os.path.join(checksum_dir, f"{game_name}.cache.json")
+
+def blocks_path_for(checksum_dir, game_name):
+    return os.path.join(checksum_dir, f"{game_name}.blocks.json")
+
+def damage_path_for(checksum_dir, game_name):
+    return os.path.join(checksum_dir, f"{game_name}.damage.json")
+
+def journal_path_for(checksum_dir, game_name):
+    return os.path.join(checksum_dir, f"{game_name}.journal")
+
+def dirty_path_for(checksum_dir, game_name):
+    return os.path.join(checksum_dir, f"{game_name}.dirty.json")
+
+def content_cache_path_for(checksum_dir):
+    # Shared by the whole library; no per-game file name can end like this
+    return os.path.join(checksum_dir, "library.content.json")
+
+def library_index_path_for(checksum_dir):
+    return os.path.join(checksum_dir, "library.index.json")
+
+
+# --- HASH ALGORITHMS ---
+class Crc32Hasher:
+    # hashlib-style wrapper so CRC32 fits the same update()/hexdigest() loop
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+# name: (hasher factory, manifest extension, hex digest length, label)
+ALGORITHMS = {
+    "md5": (hashlib.md5, ".md5", 32, "MD5"),
+    "sha1": (hashlib.sha1, ".sha1", 40, "SHA-1"),
+    "sha256": (hashlib.sha256, ".sha256", 64, "SHA-256"),
+    "blake2b": (hashlib.blake2b, ".blake2b", 128, "BLAKE2b"),
+    "crc32": (Crc32Hasher, ".sfv", 8, "CRC32 (.sfv)"),
+}
+# Other extensions people use for the same formats
+EXTRA_EXTENSIONS = {".sha": "sha1", ".sha2": "sha256", ".b2": "blake2b", ".crc": "crc32"}
+MANIFEST_EXTENSIONS = tuple(info[1] for info in ALGORITHMS.values()) + tuple(EXTRA_EXTENSIONS)
+
+def new_hasher(algorithm):
+    return ALGORITHMS[algorithm][0]()
+
+def algorithm_for_extension(path):
+    extension = os.path.splitext(path)[1].lower()
+    for name, info in ALGORITHMS.items():
+        if info[1] == extension:
+            return name
+    return EXTRA_EXTENSIONS.get(extension)
+
+def algorithm_for_digest(digest):
+    # Every algorithm we support has a different digest length
+    for name, info in ALGORITHMS.items():
+        if info[2] == len(digest):
+            return name
+    return None
+
+def benchmark_algorithms(size=64 * 1024 * 1024, chunk_size=1024 * 1024):
+    # In-memory throughput of each algorithm on this machine, in MB/s. It
+    # leaves the disk out, so it shows the ceiling the CPU allows per thread.
+    data = os.urandom(chunk_size)
+    results = {}
+    for name in ALGORITHMS:
+        hasher = new_hasher(name)
+        start = time.perf_counter()
+        for _ in range(size // chunk_size):
+            hasher.update(data)
+        hasher.hexdigest()
+        elapsed = time.perf_counter() - start
+        results[name] = round(size / elapsed / (1024 * 1024), 1) if elapsed > 0 else 0.0
+    return results
+
+
+# --- READ BACKENDS ---
+# How file bytes get from the disk into the hasher:
+#   read      f.read() per chunk, a new bytes object every time (the old way)
+#   readinto  one preallocated buffer per thread, refilled in place
+#   mmap      maps the file and hashes straight out of the page cache
+#   auto      readinto, switching to mmap for files over MMAP_THRESHOLD
+# With mmap the disk wait happens inside the hash call (page faults), so the
+# read/hash time split in the timing summary only means something for the
+# other backends.
+IO_BACKENDS = ("auto", "readinto", "mmap", "read")
+MIN_CHUNK = 64 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+MMAP_THRESHOLD = 256 * 1024 * 1024
+# Files at least this big are dropped from the page cache once hashed, so a
+# 100 GB verify doesn't evict everything else the system had cached
+DROP_CACHE_MIN = 64 * 1024 * 1024
+
+def adaptive_chunk_size(file_size):
+    # Whole file in one read when it fits, otherwise MAX_CHUNK at a time
+    chunk = MIN_CHUNK
+    while chunk < file_size and chunk < MAX_CHUNK:
+        chunk *= 2
+    return chunk
+
+def resolve_backend(backend, file_size):
+    if backend == "auto":
+        # Mapping huge files needs a 64-bit address space
+        big = file_size >= MMAP_THRESHOLD and sys.maxsize > 2 ** 32
+        return "mmap" if big else "readinto"
+    return backend
+
+def advise_sequential(fd):
+    # Kernel read-ahead hint. posix_fadvise only exists on Linux/BSD; elsewhere
+    # this is a no-op.
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def drop_from_cache(fd):
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+def read_chunks(f, backend, chunk_size, buffer=None):
+    # Yields memoryviews over the contents of f (opened with buffering=0).
+    # Each view is only valid until the next one is requested, and the caller
+    # should release() it so an mmap can be closed straight away.
+    if backend == "read":
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk: return
+            yield memoryview(chunk)
+    elif backend == "mmap":
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files (and some special files) can't be mapped
+            yield from read_chunks(f, "readinto", chunk_size, buffer)
+            return
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size]
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # The caller still holds a chunk; the map closes when it's freed
+                pass
+    else:
+        if buffer is None or len(buffer) < chunk_size:
+            buffer = bytearray(chunk_size)
+        view = memoryview(buffer)[:chunk_size]
+        try:
+            while True:
+                count = f.readinto(view)
+                if not count: return
+                yield view[:count]
+        finally:
+            view.release()
+
+def benchmark_io(file_path, chunk_size=0, limit=1024 * 1024 * 1024):
+    # Read speed of each backend over the first `limit` bytes of one file, in
+    # MB/s. Every pass feeds a CRC32 (the cheapest hash) so mmap pages really
+    # get touched. Where the kernel allows it the file is dropped from the page
+    # cache before each pass, so all of them start cold.
+    chunk_size = chunk_size or adaptive_chunk_size(os.path.getsize(file_path))
+    results = {}
+    for backend in IO_BACKENDS[1:]:
+        with open(file_path, "rb", buffering=0) as f:
+            drop_from_cache(f.fileno())
+            advise_sequential(f.fileno())
+            hasher = Crc32Hasher()
+            done = 0
+            start = time.perf_counter()
+            chunks = read_chunks(f, backend, chunk_size)
+            for chunk in chunks:
+                hasher.update(chunk)
+                done += len(chunk)
+                chunk.release()
+                if done >= limit: break
+            chunks.close()
+            elapsed = time.perf_counter() - start
+            drop_from_cache(f.fileno())
+        results[backend] = round(done / elapsed / (1024 * 1024), 1) if elapsed > 0 else 0.0
+    return results
+
+
+# --- MANIFESTS ---
+# Plain manifests are the usual "hash *path" lines (md5sum/sha1sum style),
+# BSD-style "SHA256 (path) = hash" lines, or "path CRC" lines for .sfv.
+# Manifests we generate also carry a ";size <bytes> *path" comment before
+# each entry. Anything that reads these files (including older versions of
+# this tool) skips ";" lines, so the file stays compatible, but quick checks
+# can compare sizes without hashing.
+MANIFEST_HEADER = "; Game Integrity Tool manifest - ';size' lines hold file sizes in bytes"
+
+def clean_manifest_path(name):
+    # Normalize path to handle Windows/Linux slashes
+    return name.lstrip('*').replace('\\', os.sep).replace('/', os.sep)
+
+BSD_LINE = re.compile(r"^[\w-]+ \((.+)\) = ([0-9a-fA-F]+)$")
+
+def iter_manifest(md5_file_path):
+    # Yields (rel_path, hash, size) one entry at a time; size is None if the
+    # manifest has no ";size" line for it. Only the current line is held in
+    # memory, so a verify can start hashing while the rest is still being
+    # read. Raises OSError/UnicodeDecodeError if the file is unreadable.
+    sfv = algorithm_for_extension(md5_file_path) == "crc32"
+    sizes = {}
+    with open(md5_file_path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            if line.startswith(';'):
+                if line.startswith(';size '):
+                    parts = line.split(None, 2)
+                    if len(parts) == 3 and parts[1].isdigit():
+                        sizes[clean_manifest_path(parts[2])] = int(parts[1])
+                continue
+            bsd = BSD_LINE.match(line)
+            if bsd:
+                name, h = bsd.groups()
+            elif sfv:
+                parts = line.rsplit(None, 1)
+                if len(parts) != 2: continue
+                name, h = parts
+            else:
+                parts = line.split(None, 1)
+                if len(parts) != 2: continue
+                h, name = parts
+            rel_path = clean_manifest_path(name)
+            # The ";size" line comes right before its entry, so this stays tiny
+            yield rel_path, h.lower(), sizes.pop(rel_path, None)
+
+def read_manifest(md5_file_path, sizes=None):
+    # The whole manifest at once: {rel_path: hash}. If a dict is passed as
+    # sizes it is filled with {rel_path: size}.
+    master_list = {}
+    for rel_path, digest, size in iter_manifest(md5_file_path):
+        master_list[rel_path] = digest
+        if sizes is not None and size is not None:
+            sizes[rel_path] = size
+    return master_list
+
+def manifest_algorithm(md5_file_path, sample_digest=None):
+    # Extension first, then the length of a digest from the file
+    algorithm = algorithm_for_extension(md5_file_path)
+    if algorithm is None and sample_digest:
+        algorithm = algorithm_for_digest(sample_digest)
+    return algorithm or "md5"
+
+def adopt_manifest(new_path, local_path):
+    # Copies an updated manifest over the local one, through a temp file so
+    # the local one stays intact if the copy fails halfway
+    tmp_path = local_path + ".tmp"
+    with open(new_path, "rb") as src, open(tmp_path, "wb") as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk: break
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, local_path)
+
+class ManifestWriter:
+    # Writes entries to <manifest>.tmp as they are produced and renames it
+    # over the real manifest in commit(), so Stop or a crash never leaves a
+    # half-written manifest behind or destroys the previous one.
+    def __init__(self, md5_file_path, algorithm="md5"):
+        self.path = md5_file_path
+        self.tmp_path = md5_file_path + ".tmp"
+        self.algorithm = algorithm
+        self.count = 0
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.file.write(MANIFEST_HEADER + "\n")
+
+    def add(self, rel_path, digest, size):
+        if self.algorithm == "crc32":
+            entry = f"{rel_path} {digest}"
+        else:
+            entry = f"{digest} *{rel_path}"
+        self.file.write(f";size {size} *{rel_path}\n{entry}\n")
+        self.count += 1
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        try:
+            # Closing flushes what's buffered, which fails again on a full disk
+            self.file.close()
+        except OSError:
+            pass
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+# --- STAT CACHE ---
+# Remembers the digest of every file we hashed together with its
+# (size, mtime_ns, inode). If the stat tuple still matches on the next run
+# the file can't have been rewritten, so its bytes don't need to be read again.
+# Format: {"version": 1, "algorithm": "md5",
+#          "files": {rel_path: [size, mtime_ns, inode, digest]},
+#          "extras": {rel_path: [size, mtime_ns, inode]}}
+# "extras" are the files on disk that no manifest entry matched at the last
+# full check, so a tracked verify (which doesn't walk the folder) still
+# knows about them. Digests are only comparable within one algorithm, so a
+# cache made with a different one is treated as empty.
+CACHE_VERSION = 1
+
+def load_hash_cache(cache_path, algorithm="md5", extras=None):
+    # If a dict is passed as extras it is filled with the "extras" entries
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION or data.get("algorithm", "md5") != algorithm:
+            return {}
+        if extras is not None:
+            extras.update(data.get("extras", {}))
+        return data.get("files", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_hash_cache(cache_path, entries, algorithm="md5", extras=None):
+    # Write to a temp file first so a crash never leaves a half-written cache
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "algorithm": algorithm, "files": entries, "extras": extras or {}},
+                  f, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+
+# --- CONTENT CACHE ---
+# Hardlinked files (Proton prefixes, shared redistributables, deduplicated
+# installs) are one set of bytes under several paths, often in different
+# games. The content cache keeps one digest per (device, inode, size,
+# mtime_ns) and algorithm, and is shared by every engine of a library run,
+# so those bytes are only read once. Only files with more than one link go
+# in, which keeps it small.
+# Format: {"version": 1, "files": {"dev:inode:size:mtime_ns": {algorithm: digest}}}
+CONTENT_VERSION = 1
+# Oldest entries are dropped past this many
+CONTENT_MAX_ENTRIES = 200000
+
+def content_key(st):
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+class ContentCache:
+    # claim() returns the digest if the bytes were hashed before. If not it
+    # returns None, and the caller has to hash the file and publish() the
+    # result (None if that failed). Another thread claiming the same bytes
+    # meanwhile waits for that instead of reading them a second time.
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = None  # loaded on first use
+        self.pending = {}  # (key, algorithm): Event while someone hashes it
+        self.changed = False
+        self.parent = None  # set on a fresh() view
+
+    def fresh(self):
+        # For a full rehash: a view that starts empty, so every hardlinked
+        # file is read again (once per run), while its digests still update
+        # this cache for later runs
+        view = ContentCache()
+        view.parent = self
+        return view
+
+    def load(self):
+        self.entries = {}
+        if not self.path: return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CONTENT_VERSION:
+                self.entries = dict(data.get("files", {}))
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    def claim(self, key, algorithm):
+        while True:
+            with self.lock:
+                if self.entries is None:
+                    self.load()
+                digests = self.entries.get(key)
+                if digests and algorithm in digests:
+                    # Move it to the end so pruning drops it last
+                    self.entries[key] = self.entries.pop(key)
+                    return digests[algorithm]
+                event = self.pending.get((key, algorithm))
+                if event is None:
+                    self.pending[(key, algorithm)] = threading.Event()
+                    return None
+            # Another thread is reading these same bytes right now
+            event.wait()
+
+    def publish(self, key, algorithm, digest):
+        with self.lock:
+            if digest:
+                self.entries.setdefault(key, {})[algorithm] = digest
+                self.changed = True
+            event = self.pending.pop((key, algorithm), None)
+        if event:
+            event.set()
+        if self.parent and digest:
+            self.parent.store(key, algorithm, digest)
+
+    def store(self, key, algorithm, digest):
+        with self.lock:
+            if self.entries is None:
+                self.load()
+            self.entries.setdefault(key, {})[algorithm] = digest
+            self.changed = True
+
+    def save(self):
+        if not self.path: return
+        with self.lock:
+            if not self.changed: return
+            for key in list(itertools.islice(self.entries, max(0, len(self.entries) - CONTENT_MAX_ENTRIES))):
+                del self.entries[key]
+            data = json.dumps({"version": CONTENT_VERSION, "files": self.entries}, separators=(",", ":"))
+            self.changed = False
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+# --- PROGRESS JOURNAL ---
+# A running generate/verify appends one JSON line per finished file, so a
+# stopped or crashed run can be resumed instead of starting over. The first
+# line describes the run; a resume only reuses a journal with the same one.
+# Entry lines use the stat cache layout: [rel_path, size, mtime_ns, inode, digest].
+# The journal is deleted once a run completes.
+JOURNAL_VERSION = 1
+
+def read_journal(journal_path, header_only=False):
+    # Returns (header, {rel_path: [size, mtime_ns, inode, digest]}), or
+    # (None, {}) if there is no usable journal. A half-written last line
+    # (crash mid-write) is skipped.
+    entries = {}
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict) or header.get("version") != JOURNAL_VERSION:
+                return None, {}
+            if header_only:
+                return header, {}
+            for line in f:
+                try:
+                    rel_path, *entry = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                if len(entry) == 4:
+                    entries[rel_path] = entry
+    except (OSError, ValueError):
+        return None, {}
+    return header, entries
+
+class Journal:
+    def __init__(self, journal_path, header, append=False):
+        self.path = journal_path
+        self.file = open(journal_path, "a" if append else "w", encoding="utf-8")
+        if not append:
+            self.file.write(json.dumps(header) + "\n")
+
+    def add(self, rel_path, key, digest):
+        self.file.write(json.dumps([rel_path, *key, digest], ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self, delete=False):
+        self.file.close()
+        if delete:
+            os.remove(self.path)
+
+
+# --- BLOCK MANIFESTS ---
+# Optional companion to a manifest: every file bigger than one block also gets
+# one hash per BLOCK_SIZE slice. When a big archive fails verify we can say
+# which byte ranges are damaged, and a recheck only has to read those blocks.
+#   <game>.blocks.json = {"version": 1, "block_size": N,
+#                         "files": {rel_path: [size, file_digest, [block_digest, ...]]}}
+#   <game>.damage.json = {"version": 1, "block_size": N, "files": {rel_path: [block_index, ...]}}
+BLOCK_VERSION = 1
+BLOCK_SIZE = 16 * 1024 * 1024
+
+def load_block_file(path):
+    # Returns (block_size, files), or (BLOCK_SIZE, {}) if there is nothing usable
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != BLOCK_VERSION:
+            return BLOCK_SIZE, {}
+        return data["block_size"], data.get("files", {})
+    except (OSError, ValueError, AttributeError, KeyError):
+        return BLOCK_SIZE, {}
+
+def save_block_file(path, block_size, files):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": BLOCK_VERSION, "block_size": block_size, "files": files}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def block_ranges(indices, block_size, file_size):
+    # [3, 4, 5, 9] -> [(3 * bs, 6 * bs), (9 * bs, 10 * bs)], clipped to the file size
+    ranges = []
+    for index in sorted(indices):
+        start = index * block_size
+        end = min(start + block_size, file_size) if file_size > start else start + block_size
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+def describe_ranges(ranges):
+    return ", ".join(f"{format_bytes(start)}–{format_bytes(end)}" for start, end in ranges)
+
+
+# --- DIRECTORY SCAN ---
+def scan_folder(folder_path, stopped=None):
+    # Returns {rel_path: (size, mtime_ns, inode)} for every file under folder_path.
+    # os.scandir hands us the stat info while walking, so there is no second
+    # round of os.stat/os.path.exists calls per file later on.
+    # stopped() is checked before each folder; once it returns True the walk
+    # ends early and the result is incomplete.
+    found = {}
+    pending = [""]
+    while pending:
+        if stopped and stopped(): break
+        rel_dir = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(folder_path, rel_dir))
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(rel_path)
+                    elif entry.is_file():
+                        # Only .md5 is skipped, as always: .sfv, .sha1 etc. can be real game files
+                        if entry.name.endswith(".md5"): continue
+                        st = entry.stat()
+                        # entry.inode() instead of st.st_ino: on Windows the cached
+                        # scandir stat leaves st_ino as 0
+                        found[rel_path] = (st.st_size, st.st_mtime_ns, entry.inode())
+                except OSError:
+                    continue
+    return found
+
+class Reconciler:
+    # Matches manifest paths to scanned files one at a time, so a manifest
+    # can be checked while it's still being read. Set and dict lookups only,
+    # so it stays linear on 100k+ file installs.
+    # lookup(rel_path) -> stat key or None is asked about paths that aren't
+    # in current_files, for when current_files isn't a full scan.
+    def __init__(self, current_files, lookup=None):
+        self.current_files = current_files
+        self.lookup = lookup
+        self.matched = set()
+        self.folded = None
+
+    def match(self, rel_path):
+        # The disk path for a manifest path, or None if it's missing
+        if rel_path in self.current_files:
+            self.matched.add(rel_path)
+            return rel_path
+        # Manifests made on Windows don't care about case, but Linux does.
+        # Only build the lowercase index the first time an exact lookup misses.
+        if self.folded is None:
+            self.folded = {}
+            for disk_path in self.current_files:
+                self.folded.setdefault(disk_path.lower(), disk_path)
+        disk_path = self.folded.get(rel_path.lower())
+        if disk_path is not None and disk_path not in self.matched:
+            self.matched.add(disk_path)
+            return disk_path
+        key = self.lookup(rel_path) if self.lookup else None
+        if key is not None:
+            self.current_files[rel_path] = key
+            self.matched.add(rel_path)
+            return rel_path
+        return None
+
+    def extra(self):
+        # Files on disk that no manifest entry matched, sorted
+        return sorted(set(self.current_files).difference(self.matched))
+
+def reconcile(master_list, current_files):
+    # Whole-manifest version of Reconciler:
+    #   matched = {disk_rel_path: manifest_rel_path}
+    #   missing = [manifest_rel_path, ...]
+    #   extra   = [disk_rel_path, ...]
+    reconciler = Reconciler(current_files)
+    matched = {}
+    missing = []
+    for rel_path in master_list:
+        disk_path = reconciler.match(rel_path)
+        if disk_path is None:
+            missing.append(rel_path)
+        else:
+            matched[disk_path] = rel_path
+    return matched, missing, reconciler.extra()
+
+# --- PROGRESS / THROUGHPUT ---
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} TB"
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+class ThroughputMeter:
+    # Shared by the hashing threads (add_bytes/add_times) and the worker thread
+    # (snapshot). Progress is weighted by bytes, not by file count, so a 40 GB
+    # archive moves the bar as much as it actually costs.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bytes_total = 0
+        self.bytes_skipped = 0
+        self.bytes_done = 0
+        self.read_time = 0.0
+        self.hash_time = 0.0
+        self.started = time.perf_counter()
+        self.last_time = self.started
+        self.last_bytes = 0
+        self.rate = 0.0
+
+    def start(self, bytes_total, bytes_skipped=0):
+        self.bytes_total = bytes_total
+        self.bytes_skipped = bytes_skipped
+        self.started = self.last_time = time.perf_counter()
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.bytes_done += count
+
+    def skip(self, count):
+        # Bytes that count as done without being read (cached, resumed, ...)
+        with self.lock:
+            self.bytes_skipped += count
+
+    def set_total(self, bytes_total):
+        # For runs that only know the real total once the manifest is read
+        self.bytes_total = bytes_total
+
+    def add_times(self, read_time, hash_time):
+        with self.lock:
+            self.read_time += read_time
+            self.hash_time += hash_time
+
+    def snapshot(self):
+        now = time.perf_counter()
+        with self.lock:
+            done = self.bytes_done
+            skipped = self.bytes_skipped
+        # Smoothed "current" speed for the label, overall average for the ETA
+        if now > self.last_time:
+            current = (done - self.last_bytes) / (now - self.last_time)
+            self.rate = current if self.rate == 0 else self.rate * 0.7 + current * 0.3
+            self.last_time, self.last_bytes = now, done
+        average = done / (now - self.started) if now > self.started else 0
+        remaining = max(0, self.bytes_total - skipped - done)
+        return {
+            "bytes_done": min(self.bytes_total, done + skipped),
+            "bytes_total": self.bytes_total,
+            "mb_per_s": self.rate / (1024 * 1024),
+            "eta": remaining / average if average > 0 else -1,
+        }
+
+
+# --- LOG ENTRIES ---
+# The engine reports (status, text, color) tuples instead of HTML strings.
+# text is just the relative path for file results; how a status is drawn is
+# up to the front end. color is only set for one-off GUI messages.
+class LogStatus(IntEnum):
+    INFO = 0
+    HASHED = 1
+    OK = 2
+    CORRUPT = 3
+    MISSING = 4
+    EXTRA = 5
+    WARNING = 6
+    ERROR = 7
+    SUCCESS = 8
+    SUMMARY = 9
+
+
+# --- TRIAGE ---
+# Mode "triage" checks files in order of how likely they are to be why a
+# game crashes. Lower rank = checked (and reported) first.
+TRIAGE_EXTENSIONS = (".exe", ".dll", ".so", ".dylib", ".asi", ".sys")
+TRIAGE_REASONS = {
+    0: "missing",
+    1: "wrong size",
+    2: "executable or library",
+    3: "modified after the hash was made",
+    4: "content differs",
+}
+
+def triage_rank(rel_path, key, manifest_mtime_ns):
+    if rel_path.lower().endswith(TRIAGE_EXTENSIONS): return 2
+    if key[1] > manifest_mtime_ns: return 3
+    return 4
+
+
+# --- ENGINE ---
+class HashEngine:
+    # Runs one pass over a game folder and returns the stats dict. mode is
+    # "generate", "verify", "quick" (stat calls only: missing files and
+    # size mismatches, nothing is hashed), "triage", "delta" or "recheck"
+    # (see below). Front ends hook in through the callbacks:
+    #   on_log(entries)   list of (LogStatus, text, color), sent in batches
+    #   on_progress(int)  percent done, weighted by bytes
+    #   on_speed(dict)    bytes_done/bytes_total/mb_per_s/eta/files_done/files_total
+    # None of them are required, and all are called from the thread that
+    # called run().
+    #
+    # algorithm picks the hash "generate" writes (see ALGORITHMS). "verify"
+    # and "quick" ignore it and use whatever the manifest was made with.
+    # io_backend (see IO_BACKENDS) and chunk_size (0 = adaptive) pick how files
+    # are read; drop_cache keeps big files out of the page cache afterwards.
+    #
+    # With journal_path set, "generate" and "verify" record every finished
+    # file there. resume=True picks up a matching journal from a run that was
+    # stopped, and only the files it hadn't finished are hashed.
+    #
+    # "triage" is a verify that checks the likeliest culprits first (see
+    # triage_rank) and stops early after max_failures problems or
+    # time_budget seconds (0 = no limit). stats["suspects"] lists what it
+    # found, likeliest first, and stats["unchecked"] what it didn't get to.
+    #
+    # "delta" checks a game update: md5_file_path is the new manifest and
+    # base_manifest the old one. Only entries whose digest changed or that
+    # are new get read; everything else is only stat'd and keeps the result
+    # of the last check (from the stat cache) as long as its stat still
+    # matches. stats gets "changed", "added", "removed" and "carried" counts,
+    # and files the update removed but are still there are reported as extra.
+    #
+    # content (a ContentCache, usually shared by a whole library run) lets
+    # hardlinked files reuse a digest another path or game already computed.
+    #
+    # changed is a set of paths (from ChangeWatcher.take) that were written
+    # since the last verify; "verify" re-reads them even if the stat cache
+    # says they're unchanged. With tracked=True the set is complete, so
+    # "verify" takes every other file's stat from the cache instead of
+    # walking the folder, after checking a sample of them against the disk.
+    #
+    # With block_path set, "generate" + make_blocks=True also writes a block
+    # manifest, and "verify" uses it to locate damage inside files that fail.
+    # Located damage goes to damage_path, and mode "recheck" re-reads only
+    # those blocks.
+    def __init__(self, folder_path, mode, md5_file_path=None, workers=0, cache_path=None, use_cache=True,
+                 block_path=None, damage_path=None, make_blocks=False, algorithm="md5",
+                 io_backend="auto", chunk_size=0, drop_cache=True, journal_path=None, resume=False,
+                 changed=None, tracked=False, content=None, max_failures=0, time_budget=0,
+                 base_manifest=None, on_log=None, on_progress=None, on_speed=None):
+        self.folder_path = folder_path
+        self.mode = mode
+        self.md5_file_path = md5_file_path
+        self.base_manifest = base_manifest
+        self.algorithm = algorithm
+        self.io_backend = io_backend
+        self.chunk_size = chunk_size
+        self.drop_cache = drop_cache
+        # One reusable read buffer per hashing thread
+        self.buffers = threading.local()
+        self.journal_path = journal_path
+        self.resume = resume
+        self.journal = None
+        self.changed = changed
+        self.tracked = tracked and changed is not None
+        if content is not None and not use_cache and content.parent is None:
+            # Force Full Rehash also means not trusting digests from earlier runs
+            content = content.fresh()
+        self.content = content
+        # Unmatched files from the stat cache, kept until a full check replaces them
+        self.cache_extras = {}
+        self.deduped_sizes = []
+        self.max_failures = max_failures
+        self.time_budget = time_budget
+        # Set when triage has seen enough, in-flight hashes give up early
+        self.cut_short = False
+        self.workers = workers if workers > 0 else default_worker_count()
+        self.cache_path = cache_path
+        self.use_cache = use_cache
+        self.block_path = block_path
+        self.damage_path = damage_path
+        self.make_blocks = make_blocks and block_path is not None
+        self.file_blocks = {}
+        # Files whose block hashes a verify computes in the same pass as the
+        # whole-file hash, so a failure needs no second read to locate damage
+        self.block_targets = set()
+        # {disk_rel_dir: {lowercase_name: name}}, filled by locate()
+        self.folded_dirs = {}
+        self.meter = ThroughputMeter()
+        self.file_times = []
+        self.last_tick = 0.0
+        self.pending_log = []
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.on_speed = on_speed
+        self.is_running = True
+    
+    def stop(self):
+        self.is_running = False
+
+    def thread_buffer(self, size):
+        buffer = getattr(self.buffers, "data", None)
+        if buffer is None or len(buffer) < size:
+            buffer = self.buffers.data = bytearray(size)
+        return buffer
+
+    def calculate_hash(self, file_path, blocks=None):
+        # If a list is passed as blocks it gets one md5 per BLOCK_SIZE slice,
+        # computed in the same pass as the whole-file hash
+        hasher = new_hasher(self.algorithm)
+        block_hasher = hashlib.md5()
+        block_fill = 0
+        # Time spent waiting on reads vs. inside the hash tells us whether the
+        # disk or the CPU is holding things up
+        read_time = hash_time = 0.0
+        claimed = digest = None
+        try:
+            with open(file_path, "rb", buffering=0) as f:
+                st = os.fstat(f.fileno())
+                size = st.st_size
+                if self.content is not None and blocks is None and st.st_nlink > 1:
+                    key = content_key(st)
+                    digest = self.content.claim(key, self.algorithm)
+                    if digest:
+                        # Same inode as a file hashed earlier, maybe in another game
+                        self.meter.skip(size)
+                        self.deduped_sizes.append(size)
+                        return digest
+                    claimed = key
+                backend = resolve_backend(self.io_backend, size)
+                chunk_size = self.chunk_size or adaptive_chunk_size(size)
+                buffer = self.thread_buffer(chunk_size) if backend == "readinto" else None
+                advise_sequential(f.fileno())
+                chunks = read_chunks(f, backend, chunk_size, buffer)
+                try:
+                    while True:
+                        t0 = time.perf_counter()
+                        chunk = next(chunks, None)
+                        t1 = time.perf_counter()
+                        if chunk is None: break
+                        if not self.is_running or self.cut_short:
+                            chunk.release()
+                            return None
+                        hasher.update(chunk)
+                        if blocks is not None:
+                            view = chunk
+                            while view:
+                                take = min(len(view), BLOCK_SIZE - block_fill)
+                                block_hasher.update(view[:take])
+                                block_fill += take
+                                view = view[take:]
+                                if block_fill == BLOCK_SIZE:
+                                    blocks.append(block_hasher.hexdigest())
+                                    block_hasher = hashlib.md5()
+                                    block_fill = 0
+                            view = None
+                        read_time += t1 - t0
+                        hash_time += time.perf_counter() - t1
+                        self.meter.add_bytes(len(chunk))
+                        chunk.release()
+                finally:
+                    chunks.close()
+                    if self.drop_cache and size >= DROP_CACHE_MIN:
+                        drop_from_cache(f.fileno())
+            if blocks is not None and block_fill:
+                blocks.append(block_hasher.hexdigest())
+            digest = hasher.hexdigest()
+            return digest
+        except Exception:
+            return None
+        finally:
+            self.meter.add_times(read_time, hash_time)
+            if claimed:
+                # Also wakes anyone waiting on these bytes if hashing failed
+                self.content.publish(claimed, self.algorithm, digest)
+
+    def timed_hash(self, file_path, want_blocks=False):
+        start = time.perf_counter()
+        blocks = [] if want_blocks else None
+        digest = self.calculate_hash(file_path, blocks)
+        return digest, time.perf_counter() - start, blocks
+
+    def read_blocks(self, file_path, block_size, indices):
+        # Hashes only the given blocks: {index: digest}. A block past the end
+        # of a truncated file comes back as None.
+        digests = {}
+        chunk_size = self.chunk_size or MAX_CHUNK
+        with open(file_path, "rb", buffering=0) as f, memoryview(self.thread_buffer(chunk_size)) as buffer:
+            for index in sorted(indices):
+                if not self.is_running: return None
+                f.seek(index * block_size)
+                block_hasher = hashlib.md5()
+                remaining = block_size
+                while remaining:
+                    count = f.readinto(buffer[:min(chunk_size, remaining)])
+                    if not count: break
+                    block_hasher.update(buffer[:count])
+                    remaining -= count
+                    self.meter.add_bytes(count)
+                digests[index] = block_hasher.hexdigest() if remaining < block_size else None
+        return digests
+
+    def damaged_blocks(self, full_path, entry, block_size, indices=None):
+        # Compares the file against its block manifest entry. Returns the list
+        # of damaged block indices, or None if the read failed or was stopped.
+        size, _, expected = entry
+        if indices is None:
+            indices = range(len(expected))
+        try:
+            current_size = os.path.getsize(full_path)
+            digests = self.read_blocks(full_path, block_size, indices)
+        except OSError:
+            return None
+        if digests is None:
+            return None
+        damaged = [index for index in indices if digests[index] != expected[index]]
+        if current_size > size:
+            # Anything appended past the original end counts as damage too
+            damaged.append(len(expected))
+        return damaged
+
+    def report_damage(self, rel_path, damaged, entry, block_size, stats):
+        size, _, expected = entry
+        ranges = block_ranges(damaged, block_size, size)
+        damaged_bytes = sum(end - start for start, end in ranges)
+        stats["damaged_bytes"] = stats.get("damaged_bytes", 0) + damaged_bytes
+        self.log(LogStatus.WARNING, f"   ↳ {rel_path}: {len(damaged)} of {len(expected)} blocks damaged "
+                                    f"({format_bytes(damaged_bytes)}) at {describe_ranges(ranges)}")
+
+    def save_damage(self, block_size, damage):
+        if not self.damage_path: return
+        try:
+            if damage:
+                save_block_file(self.damage_path, block_size, damage)
+            elif os.path.exists(self.damage_path):
+                os.remove(self.damage_path)
+        except OSError as e:
+            self.log(LogStatus.WARNING, f"Could not save damage list: {e}")
+
+    def tick(self, files_done, files_total, force=False):
+        # Throttled so a burst of tiny files doesn't flood the front end
+        now = time.perf_counter()
+        if not force and now - self.last_tick < 0.1:
+            return
+        self.last_tick = now
+        speed = self.meter.snapshot()
+        if speed["bytes_total"] > 0:
+            percent = int(speed["bytes_done"] / speed["bytes_total"] * 100)
+        else:
+            percent = int(files_done / files_total * 100) if files_total > 0 else 100
+        speed["files_done"] = files_done
+        speed["files_total"] = files_total
+        self.flush_log()
+        self.journal_flush()
+        if self.on_progress: self.on_progress(percent)
+        if self.on_speed: self.on_speed(speed)
+
+    def timing_summary(self, scan_time, hash_time):
+        meter = self.meter
+        slowest = sorted(self.file_times, reverse=True)[:5]
+        return {
+            "scan_s": round(scan_time, 3),
+            "hash_s": round(hash_time, 3),
+            "bytes_hashed": meter.bytes_done,
+            "mb_per_s": round(meter.bytes_done / hash_time / (1024 * 1024), 1) if hash_time > 0 else 0.0,
+            "read_s": round(meter.read_time, 3),
+            "digest_s": round(meter.hash_time, 3),
+            "slowest": [(rel_path, round(elapsed, 3), size) for elapsed, rel_path, size in slowest],
+            "io": self.io_backend,
+            "chunk_kb": self.chunk_size // 1024 if self.chunk_size else "auto",
+        }
+
+    def add_disk_stats(self, stats, current_files):
+        # What's in the folder right now, for the library index
+        stats["disk_files"] = len(current_files)
+        stats["disk_bytes"] = sum(key[0] for key in current_files.values())
+
+    def add_dedupe_stats(self, stats):
+        if self.content is not None:
+            stats["deduped"] = len(self.deduped_sizes)
+            stats["dedupe_bytes"] = sum(self.deduped_sizes)
+
+    def start_journal(self, header):
+        # Returns the entries a previous, unfinished run already recorded
+        # (empty unless resuming), and opens the journal for this run
+        if not self.journal_path: return {}
+        header = {"version": JOURNAL_VERSION, **header}
+        resumed = {}
+        if self.resume:
+            old_header, resumed = read_journal(self.journal_path)
+            if old_header != header:
+                resumed = {}
+        try:
+            self.journal = Journal(self.journal_path, header, append=bool(resumed))
+        except OSError as e:
+            self.log(LogStatus.WARNING, f"Could not write progress journal: {e}")
+        if resumed:
+            self.log(LogStatus.INFO, f"Resuming: {len(resumed)} files were already done by the last run")
+        return resumed
+
+    def finish_journal(self, failed=False):
+        # A completed run doesn't need its journal, a stopped or failed one keeps it
+        if not self.journal: return
+        try:
+            self.journal.close(delete=self.is_running and not failed)
+        except OSError as e:
+            self.log(LogStatus.WARNING, f"Could not close progress journal: {e}")
+        self.journal = None
+
+    def write_entry(self, writer, rel_path, digest, size, stats):
+        # False once the manifest can't be written (disk full), which ends the run
+        try:
+            writer.add(rel_path, digest, size)
+            return True
+        except OSError as e:
+            self.log(LogStatus.ERROR, f"ERROR writing hash file: {e}")
+            stats["error"] = str(e)
+            return False
+
+    def journal_add(self, rel_path, key, digest):
+        if self.journal and digest:
+            try:
+                self.journal.add(rel_path, key, digest)
+            except OSError:
+                pass
+
+    def journal_flush(self):
+        if not self.journal: return
+        try:
+            self.journal.flush()
+        except OSError as e:
+            # Disk full or gone: carry on without one, the run itself is fine
+            self.log(LogStatus.WARNING, f"Could not write progress journal, Resume won't be available: {e}")
+            try:
+                self.journal.file.close()
+            except OSError:
+                pass
+            self.journal = None
+
+    def save_cache(self, cache):
+        if not self.cache_path: return
+        try:
+            save_hash_cache(self.cache_path, cache, self.algorithm, self.cache_extras)
+        except OSError as e:
+            self.log(LogStatus.WARNING, f"Could not save hash cache: {e}")
+
+    def log(self, status, text, color=None):
+        # Queued here and sent in chunks by flush_log(), one callback per tick
+        # instead of one per file
+        self.pending_log.append((status, text, color))
+
+    def flush_log(self):
+        if self.pending_log:
+            if self.on_log: self.on_log(self.pending_log)
+            self.pending_log = []
+
+    def hash_files(self, jobs, lookahead=256, largest_first=True):
+        # jobs = iterable of (rel_path, full_path, size, ...), yields
+        # (job, digest). jobs can be a generator that is still reading the
+        # manifest: it's only pulled `lookahead` jobs ahead of the pool, and
+        # of those the biggest files start first, so the pool doesn't end with
+        # one thread grinding through a 40 GB archive while the others sit idle.
+        # lookahead=None takes every job up front, for lists that are known
+        # in full; that way the biggest file overall starts first.
+        # largest_first=False keeps the order the jobs come in.
+        # Results are yielded back on the calling thread, so every callback
+        # still fires from one place and stays in order.
+        # While nothing finishes (one huge file) we still wake up twice a
+        # second (job None) so the caller can report bytes/s and ETA.
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        if lookahead is None:
+            lookahead = float("inf")
+        jobs = iter(jobs)
+        queued = []
+        order = itertools.count()
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                while len(queued) < lookahead:
+                    job = next(jobs, None)
+                    if job is None: break
+                    heapq.heappush(queued, (-job[2] if largest_first else 0, next(order), job))
+                while queued and len(running) < self.workers * 2:
+                    job = heapq.heappop(queued)[2]
+                    want_blocks = (self.make_blocks and job[2] > BLOCK_SIZE) or job[0] in self.block_targets
+                    running[pool.submit(self.timed_hash, job[1], want_blocks)] = job
+                if not running: break
+                done, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                if not self.is_running: break
+                if not done:
+                    yield None, None
+                for future in done:
+                    job = running.pop(future)
+                    rel_path, size = job[0], job[2]
+                    digest, elapsed, blocks = future.result()
+                    self.file_times.append((elapsed, rel_path, size))
+                    if blocks is not None and digest:
+                        self.file_blocks[rel_path] = [size, digest, blocks]
+                    yield job, digest
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def run(self):
+        # Returns the stats dict; "error" is set if the run couldn't start
+        stats = {"ok": 0, "bad": 0, "missing": 0, "extra": 0, "cached": 0, "size_mismatch": 0, "resumed": 0}
+        
+        run_start = time.perf_counter()
+        
+        # --- GENERATE MODE ---
+        if self.mode == "generate":
+            # md5_file_path is the manifest to write. Entries go straight to a
+            # temp file as they're hashed, and it replaces the old manifest
+            # only once the run completes.
+            writer = None
+            if self.md5_file_path:
+                try:
+                    writer = ManifestWriter(self.md5_file_path, self.algorithm)
+                except OSError as e:
+                    self.log(LogStatus.ERROR, f"ERROR writing hash file: {e}")
+                    self.flush_log()
+                    stats["error"] = str(e)
+                    return stats
+            stat_keys = scan_folder(self.folder_path)
+            self.add_disk_stats(stats, stat_keys)
+            # Largest first, then by path: the order they're hashed in and
+            # written to the manifest, the same on every run
+            files_to_hash = sorted(((rel_path, os.path.join(self.folder_path, rel_path), key[0])
+                                    for rel_path, key in stat_keys.items()), key=lambda job: (-job[2], job[0]))
+            position = {job[0]: index for index, job in enumerate(files_to_hash)}
+            scan_time = time.perf_counter() - run_start
+            
+            # A fresh manifest always reads every byte (unless it's resuming
+            # a stopped run), but it also seeds the cache so the first verify
+            # afterwards is instant.
+            cache = {}
+            total_files = len(files_to_hash)
+            processed = 0
+            # Hashes finish in any order; they wait here until every entry
+            # before them is written. {position: (rel_path, digest, size) or None}
+            ready = {}
+            next_entry = 0
+
+            def write_ready():
+                nonlocal next_entry
+                while next_entry in ready:
+                    entry = ready.pop(next_entry)
+                    next_entry += 1
+                    if entry and writer and not self.write_entry(writer, *entry, stats):
+                        return False
+                return True
+
+            resumed = self.start_journal({"mode": "generate", "algorithm": self.algorithm})
+            bytes_skipped = 0
+            if resumed:
+                # Block hashes are only saved when a run completes. The ones
+                # from before can stand in for a resumed file with the same
+                # digest; a big file without them has to be read again.
+                block_size, old_blocks = load_block_file(self.block_path) if self.make_blocks else (BLOCK_SIZE, {})
+                if block_size != BLOCK_SIZE:
+                    old_blocks = {}
+                remaining = []
+                for job in files_to_hash:
+                    rel_path = job[0]
+                    done = resumed.get(rel_path)
+                    if done and self.make_blocks and job[2] > BLOCK_SIZE:
+                        entry = old_blocks.get(rel_path)
+                        if entry and entry[:2] == [job[2], done[3]]:
+                            self.file_blocks[rel_path] = entry
+                        else:
+                            done = None
+                    if done and done[:3] == list(stat_keys[rel_path]):
+                        ready[position[rel_path]] = (rel_path, done[3], job[2])
+                        cache[rel_path] = done
+                        stats["resumed"] += 1
+                        bytes_skipped += job[2]
+                        processed += 1
+                    else:
+                        remaining.append(job)
+                files_to_hash = remaining if write_ready() else []
+            hash_start = time.perf_counter()
+            self.meter.start(bytes_skipped + sum(size for _, _, size in files_to_hash), bytes_skipped)
+            results = self.hash_files(files_to_hash, lookahead=None)
+            for job, file_hash in results:
+                if job is None:
+                    self.tick(processed, total_files)
+                    continue
+                rel_path = job[0]
+                ready[position[rel_path]] = (rel_path, file_hash, job[2]) if file_hash else None
+                if not write_ready(): break
+                if file_hash:
+                    cache[rel_path] = [*stat_keys[rel_path], file_hash]
+                    self.journal_add(rel_path, stat_keys[rel_path], file_hash)
+                    self.log(LogStatus.HASHED, rel_path)
+                processed += 1
+                self.tick(processed, total_files)
+            results.close()
+            self.tick(processed, total_files, force=True)
+            # After a write error the journal stays, so Resume can pick up once there's space
+            self.finish_journal(failed="error" in stats)
+            stats["algorithm"] = self.algorithm
+            stats["timing"] = self.timing_summary(scan_time, time.perf_counter() - hash_start)
+            self.add_dedupe_stats(stats)
+            if writer:
+                stats["files"] = writer.count
+                try:
+                    if self.is_running and "error" not in stats:
+                        writer.commit()
+                    else:
+                        writer.discard()
+                except OSError as e:
+                    self.log(LogStatus.ERROR, f"ERROR writing hash file: {e}")
+                    stats["error"] = str(e)
+                    writer.discard()
+            if self.is_running and "error" not in stats:
+                self.save_cache(cache)
+                if self.make_blocks:
+                    self.save_blocks()
+                # Old damage reports were against the previous manifest
+                self.save_damage(BLOCK_SIZE, {})
+            self.flush_log()
+            return stats
+
+        # --- VERIFY MODE ---
+        elif self.mode in ("verify", "quick"):
+            return self.run_verify(stats, run_start)
+
+        elif self.mode == "triage":
+            return self.run_triage(stats, run_start)
+
+        elif self.mode == "delta":
+            return self.run_delta(stats, run_start)
+
+        elif self.mode == "recheck":
+            return self.run_recheck(stats)
+
+    def run_verify(self, stats, run_start):
+        # 1. OPEN THE MANIFEST
+        # Only the first entry is read up front, to tell which hash it uses.
+        # The rest is parsed while the files it lists are already hashing.
+        parse_start = time.perf_counter()
+        try:
+            entries = iter_manifest(self.md5_file_path)
+            first = next(entries, None)
+            manifest_stat = os.stat(self.md5_file_path)
+        except (OSError, ValueError) as e:
+            self.log(LogStatus.ERROR, f"ERROR reading hash file: {e}")
+            self.flush_log()
+            stats["error"] = str(e)
+            return stats
+        if first is not None:
+            entries = itertools.chain([first], entries)
+        self.algorithm = manifest_algorithm(self.md5_file_path, first[1] if first else None)
+        stats["algorithm"] = self.algorithm
+        cache = load_hash_cache(self.cache_path, self.algorithm, self.cache_extras) if self.cache_path else {}
+
+        # 2. SCAN CURRENT FOLDER
+        scan_start = time.perf_counter()
+        current_files = None
+        lookup = None
+        forced = set()
+        if self.changed is not None and self.mode == "verify":
+            forced = set(self.changed)
+            if self.tracked and self.use_cache:
+                tracked = self.tracked_scan(cache)
+                if tracked:
+                    current_files, forced = tracked
+                    # Manifest entries the cache doesn't know get a stat of their own
+                    lookup = self.stat_file
+                    stats["tracked"] = len(forced)
+                else:
+                    self.log(LogStatus.INFO, "Tracked changes don't match the disk, checking every file instead.")
+        if current_files is None:
+            current_files = scan_folder(self.folder_path)
+        scan_time = time.perf_counter() - scan_start
+        if not self.is_running:
+            self.flush_log()
+            return stats
+
+        if self.mode == "quick":
+            # Files whose size matched but were never hashed
+            stats["unverified"] = 0
+            resumed = {}
+        else:
+            resumed = self.start_journal({"mode": "verify", "algorithm": self.algorithm,
+                                          "manifest": os.path.abspath(self.md5_file_path),
+                                          "manifest_size": manifest_stat.st_size,
+                                          "manifest_mtime_ns": manifest_stat.st_mtime_ns})
+
+        # 3. RECONCILE EACH ENTRY AS IT'S READ
+        # Totals are guesses from the scan until the whole manifest is read
+        reconciler = Reconciler(current_files, lookup)
+        failed = {}  # {disk_rel_path: expected_hash}
+        processed = 0
+        total_items = len(current_files)
+        entries_seen = 0
+        entries_with_size = 0
+        parse_time = None
+        self.meter.start(sum(key[0] for key in current_files.values()))
+        self.tick(processed, total_items, force=True)
+        block_size, blocks = BLOCK_SIZE, {}
+        if self.mode == "verify" and self.block_path:
+            block_size, blocks = load_block_file(self.block_path)
+
+        def hash_jobs():
+            nonlocal processed, total_items, entries_seen, entries_with_size, parse_time
+            bytes_queued = 0
+            for manifest_rel, expected_hash, expected_size in entries:
+                if manifest_rel in reconciler.matched: continue  # listed twice
+                entries_seen += 1
+                rel_path = reconciler.match(manifest_rel)
+                if rel_path is None:
+                    self.log(LogStatus.MISSING, manifest_rel)
+                    stats["missing"] += 1
+                    cache.pop(manifest_rel, None)
+                    processed += 1
+                    continue
+                key = current_files[rel_path]
+                if expected_size is not None:
+                    entries_with_size += 1
+                    if expected_size != key[0]:
+                        # Wrong size can't have the right hash, no need to read it
+                        self.log(LogStatus.CORRUPT, rel_path)
+                        stats["bad"] += 1
+                        stats["size_mismatch"] += 1
+                        # Its cached stat is from before the change
+                        cache.pop(rel_path, None)
+                        self.meter.skip(key[0])
+                        processed += 1
+                        continue
+                if self.mode == "quick":
+                    stats["unverified"] += 1
+                    self.meter.skip(key[0])
+                    processed += 1
+                    continue
+                done = resumed.get(rel_path)
+                cached = cache.get(rel_path)
+                if done and done[:3] == list(key):
+                    # Already hashed by the run we're resuming
+                    if not self.report_verify(rel_path, done[3], expected_hash, stats):
+                        failed[rel_path] = expected_hash
+                    cache[rel_path] = done
+                    stats["resumed"] += 1
+                    self.meter.skip(key[0])
+                    processed += 1
+                elif self.use_cache and cached and cached[:3] == list(key) and rel_path not in forced:
+                    # Unchanged since it was last hashed, trust the cached digest
+                    if not self.report_verify(rel_path, cached[3], expected_hash, stats):
+                        failed[rel_path] = expected_hash
+                    stats["cached"] += 1
+                    self.meter.skip(key[0])
+                    processed += 1
+                else:
+                    entry = blocks.get(rel_path)
+                    if entry and entry[1] == expected_hash and block_size == BLOCK_SIZE:
+                        self.block_targets.add(rel_path)
+                    bytes_queued += key[0]
+                    yield rel_path, os.path.join(self.folder_path, rel_path), key[0], expected_hash
+            # The whole manifest is read, now the real totals are known
+            parse_time = time.perf_counter() - parse_start
+            total_items = entries_seen
+            self.meter.set_total(self.meter.bytes_skipped + bytes_queued)
+
+        # 4. VERIFY CHANGED FILES
+        hash_start = time.perf_counter()
+        try:
+            for job, current_hash in self.hash_files(hash_jobs()):
+                if job is None:
+                    self.tick(processed, total_items)
+                    continue
+                rel_path, _, _, expected_hash = job
+                if not self.report_verify(rel_path, current_hash, expected_hash, stats):
+                    failed[rel_path] = expected_hash
+                if current_hash:
+                    cache[rel_path] = [*current_files[rel_path], current_hash]
+                    self.journal_add(rel_path, current_files[rel_path], current_hash)
+                
+                processed += 1
+                self.tick(processed, total_items)
+        except (OSError, ValueError) as e:
+            # The manifest turned unreadable halfway through
+            self.log(LogStatus.ERROR, f"ERROR reading hash file: {e}")
+            stats["error"] = str(e)
+        self.tick(processed, total_items, force=True)
+        self.finish_journal()
+        stats["timing"] = self.timing_summary(scan_time, time.perf_counter() - hash_start)
+        self.add_dedupe_stats(stats)
+        # Overlaps the hashing, it's how long the manifest took to read through
+        stats["timing"]["parse_s"] = round(parse_time, 3) if parse_time is not None else None
+
+        # Even a stopped run keeps whatever it managed to hash
+        if "error" in stats or parse_time is None:
+            # Stopped before the manifest was read to the end, so any
+            # "extra" file might just be further down in it
+            self.save_cache(cache)
+            self.flush_log()
+            return stats
+        # Now also holds what the tracked scan's lookup found on disk
+        self.add_disk_stats(stats, current_files)
+        extra_files = reconciler.extra()
+        self.cache_extras = {rel_path: list(current_files[rel_path]) for rel_path in extra_files}
+        self.save_cache(cache)
+
+        if self.mode == "quick" and entries_seen and not entries_with_size:
+            self.log(LogStatus.WARNING, "This manifest has no file sizes, so the quick check can only find missing files.")
+
+        # 4b. PINPOINT DAMAGE INSIDE BIG FILES
+        if self.mode == "verify" and self.block_path and failed and self.is_running:
+            self.locate_damage(failed, stats, block_size, blocks)
+            # Any re-read counts towards the hashing numbers
+            stats["timing"] = {**self.timing_summary(scan_time, time.perf_counter() - hash_start),
+                               "parse_s": stats["timing"]["parse_s"]}
+
+        # 5. REPORT EXTRAS
+        stats["extra"] = len(extra_files)
+        for extra_file in extra_files:
+            self.log(LogStatus.EXTRA, extra_file)
+
+        self.flush_log()
+        return stats
+
+    def run_triage(self, stats, run_start):
+        # 1. SCAN AND READ THE WHOLE MANIFEST
+        # Ordering needs every entry up front, unlike a streaming verify
+        current_files = scan_folder(self.folder_path)
+        self.add_disk_stats(stats, current_files)
+        scan_time = time.perf_counter() - run_start
+        sizes = {}
+        try:
+            master_list = read_manifest(self.md5_file_path, sizes)
+            manifest_mtime_ns = os.stat(self.md5_file_path).st_mtime_ns
+        except (OSError, ValueError) as e:
+            self.log(LogStatus.ERROR, f"ERROR reading hash file: {e}")
+            self.flush_log()
+            stats["error"] = str(e)
+            return stats
+        self.algorithm = manifest_algorithm(self.md5_file_path, next(iter(master_list.values()), None))
+        stats["algorithm"] = self.algorithm
+        cache = load_hash_cache(self.cache_path, self.algorithm, self.cache_extras) if self.cache_path else {}
+        matched, missing, extra_files = reconcile(master_list, current_files)
+        self.cache_extras = {rel_path: list(current_files[rel_path]) for rel_path in extra_files}
+        total_items = len(master_list)
+        processed = 0
+        suspects = []  # (rank, rel_path, status)
+
+        # 2. MISSING, WRONG SIZE AND CACHED: NO READS NEEDED
+        for rel_path in missing:
+            self.log(LogStatus.MISSING, rel_path)
+            stats["missing"] += 1
+            suspects.append((0, rel_path, "missing"))
+            cache.pop(rel_path, None)
+            processed += 1
+        jobs = []
+        bytes_skipped = 0
+        for rel_path, manifest_rel in matched.items():
+            key = current_files[rel_path]
+            expected_hash = master_list[manifest_rel]
+            expected_size = sizes.get(manifest_rel)
+            if expected_size is not None and expected_size != key[0]:
+                self.log(LogStatus.CORRUPT, rel_path)
+                stats["bad"] += 1
+                stats["size_mismatch"] += 1
+                suspects.append((1, rel_path, "corrupt"))
+                cache.pop(rel_path, None)
+                processed += 1
+                continue
+            rank = triage_rank(rel_path, key, manifest_mtime_ns)
+            cached = cache.get(rel_path)
+            if self.use_cache and cached and cached[:3] == list(key):
+                if not self.report_verify(rel_path, cached[3], expected_hash, stats):
+                    suspects.append((rank, rel_path, "corrupt"))
+                stats["cached"] += 1
+                bytes_skipped += key[0]
+                processed += 1
+                continue
+            jobs.append((rank, key[0], rel_path, expected_hash))
+
+        # 3. HASH THE REST, LIKELIEST CULPRITS AND SMALL FILES FIRST
+        jobs.sort()
+        files_to_hash = [(rel_path, os.path.join(self.folder_path, rel_path), size, expected_hash, rank)
+                         for rank, size, rel_path, expected_hash in jobs]
+        self.meter.start(bytes_skipped + sum(size for _, size, _, _ in jobs), bytes_skipped)
+        self.tick(processed, total_items, force=True)
+        deadline = run_start + self.time_budget if self.time_budget > 0 else None
+        hash_start = time.perf_counter()
+        if self.max_failures and stats["bad"] + stats["missing"] >= self.max_failures:
+            # Missing and resized files alone already hit the limit
+            self.cut_short = True
+            files_to_hash = []
+        results = self.hash_files(files_to_hash, largest_first=False)
+        for job, current_hash in results:
+            if job is not None:
+                rel_path, _, _, expected_hash, rank = job
+                if not self.report_verify(rel_path, current_hash, expected_hash, stats):
+                    suspects.append((rank, rel_path, "corrupt"))
+                if current_hash:
+                    cache[rel_path] = [*current_files[rel_path], current_hash]
+                processed += 1
+            self.tick(processed, total_items)
+            failures = stats["bad"] + stats["missing"]
+            if (self.max_failures and failures >= self.max_failures) or (deadline and time.perf_counter() >= deadline):
+                # Seen enough. Files still being read give up right away.
+                self.cut_short = True
+                break
+        results.close()
+        stats["unchecked"] = total_items - processed
+        if self.cut_short and stats["unchecked"]:
+            self.log(LogStatus.WARNING, f"Triage stopped early, {stats['unchecked']} files were not checked.")
+        self.tick(processed, total_items, force=True)
+        stats["timing"] = self.timing_summary(scan_time, time.perf_counter() - hash_start)
+        self.add_dedupe_stats(stats)
+        self.save_cache(cache)
+
+        # 4. REPORT, LIKELIEST FIRST
+        suspects.sort()
+        stats["suspects"] = [{"path": rel_path, "status": status, "reason": TRIAGE_REASONS[rank]}
+                             for rank, rel_path, status in suspects]
+        stats["extra"] = len(extra_files)
+        for extra_file in extra_files:
+            self.log(LogStatus.EXTRA, extra_file)
+        self.flush_log()
+        return stats
+
+    def run_delta(self, stats, run_start):
+        # 1. DIFF THE OLD AND NEW MANIFEST
+        # Nothing in the game folder is touched yet
+        new_sizes = {}
+        try:
+            old_list = read_manifest(self.base_manifest)
+            new_list = read_manifest(self.md5_file_path, new_sizes)
+        except (OSError, ValueError, TypeError) as e:
+            self.log(LogStatus.ERROR, f"ERROR reading hash file: {e}")
+            self.flush_log()
+            stats["error"] = str(e)
+            return stats
+        self.algorithm = manifest_algorithm(self.md5_file_path, next(iter(new_list.values()), None))
+        stats["algorithm"] = self.algorithm
+        if manifest_algorithm(self.base_manifest, next(iter(old_list.values()), None)) != self.algorithm:
+            # Digests of different hashes never match, everything would look changed
+            self.log(LogStatus.ERROR, "The old and new hash files use different algorithms, run a full verify instead.")
+            self.flush_log()
+            stats["error"] = "algorithm mismatch"
+            return stats
+        targets = {rel_path for rel_path, digest in new_list.items() if old_list.get(rel_path) != digest}
+        removed = [rel_path for rel_path in old_list if rel_path not in new_list]
+        stats["added"] = sum(1 for rel_path in targets if rel_path not in old_list)
+        stats["changed"] = len(targets) - stats["added"]
+        stats["removed"] = len(removed)
+        stats["carried"] = 0
+        parse_time = time.perf_counter() - run_start
+        cache = load_hash_cache(self.cache_path, self.algorithm, self.cache_extras) if self.cache_path else {}
+
+        # 2. STAT EVERY ENTRY
+        # Files the update kept carry over the result of the last check, but
+        # only while the disk still agrees with the cache: missing and resized
+        # files were dropped from it by that check, and anything rewritten
+        # since has to be read again.
+        scan_start = time.perf_counter()
+        processed = 0
+        current_files = {}
+        jobs = []
+        bytes_skipped = 0
+        for manifest_rel, digest in new_list.items():
+            rel_path, key = self.locate(manifest_rel)
+            if key is None:
+                self.log(LogStatus.MISSING, manifest_rel)
+                stats["missing"] += 1
+                cache.pop(manifest_rel, None)
+                processed += 1
+                continue
+            current_files[rel_path] = key
+            expected_size = new_sizes.get(manifest_rel)
+            if expected_size is not None and expected_size != key[0]:
+                # Truncated, or the patch didn't finish writing it
+                self.log(LogStatus.CORRUPT, rel_path)
+                stats["bad"] += 1
+                stats["size_mismatch"] += 1
+                cache.pop(rel_path, None)
+                processed += 1
+                continue
+            cached = cache.get(rel_path)
+            touched = manifest_rel in targets
+            if cached and cached[:3] == list(key) and (self.use_cache or not touched):
+                # A file that failed the last check still fails against the new list
+                self.report_verify(rel_path, cached[3], digest, stats)
+                if touched:
+                    # Already read since the update, e.g. by an earlier delta check
+                    stats["cached"] += 1
+                else:
+                    stats["carried"] += 1
+                bytes_skipped += key[0]
+                processed += 1
+                continue
+            jobs.append((rel_path, os.path.join(self.folder_path, rel_path), key[0], digest))
+        for manifest_rel in removed:
+            rel_path, key = self.locate(manifest_rel)
+            if key is not None:
+                # The update should have deleted it
+                self.log(LogStatus.EXTRA, rel_path)
+                stats["extra"] += 1
+            else:
+                cache.pop(manifest_rel, None)
+        scan_time = time.perf_counter() - scan_start
+
+        # 3. HASH WHAT THE UPDATE TOUCHED OR THE DISK CHANGED
+        hash_start = time.perf_counter()
+        self.meter.start(bytes_skipped + sum(job[2] for job in jobs), bytes_skipped)
+        self.tick(processed, len(new_list), force=True)
+        for job, current_hash in self.hash_files(jobs, lookahead=None):
+            if job is None:
+                self.tick(processed, len(new_list))
+                continue
+            rel_path, _, _, expected_hash = job
+            self.report_verify(rel_path, current_hash, expected_hash, stats)
+            if current_hash:
+                cache[rel_path] = [*current_files[rel_path], current_hash]
+            processed += 1
+            self.tick(processed, len(new_list))
+        self.tick(processed, len(new_list), force=True)
+        stats["timing"] = self.timing_summary(scan_time, time.perf_counter() - hash_start)
+        stats["timing"]["parse_s"] = round(parse_time, 3)
+        self.add_dedupe_stats(stats)
+        self.save_cache(cache)
+        self.flush_log()
+        return stats
+
+    def locate(self, manifest_rel):
+        # (disk_rel_path, key) for a manifest path without scanning the whole
+        # folder, or (None, None) if it isn't there. Like Reconciler, a path
+        # from a Windows-made manifest may differ in case; each folder on the
+        # way is then listed once and matched case-insensitively.
+        key = self.stat_file(manifest_rel)
+        if key is not None:
+            return manifest_rel, key
+        disk_path = ""
+        for part in manifest_rel.split(os.sep):
+            names = self.folded_dirs.get(disk_path)
+            if names is None:
+                names = self.folded_dirs[disk_path] = {}
+                try:
+                    for name in os.listdir(os.path.join(self.folder_path, disk_path)):
+                        names.setdefault(name.lower(), name)
+                except OSError:
+                    pass
+            name = names.get(part.lower())
+            if name is None:
+                return None, None
+            disk_path = os.path.join(disk_path, name) if disk_path else name
+        key = self.stat_file(disk_path)
+        return (disk_path, key) if key is not None else (None, None)
+
+    def stat_file(self, rel_path):
+        # (size, mtime_ns, inode) like scan_folder, or None if it isn't a file
+        if rel_path.endswith(".md5"): return None
+        try:
+            st = os.stat(os.path.join(self.folder_path, rel_path))
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino) if stat.S_ISREG(st.st_mode) else None
+
+    def tracked_scan(self, cache):
+        # What scan_folder would return, built from the stat cache plus a
+        # fresh stat of every path the watcher saw change, so a verify after
+        # a small mod install doesn't walk 100k files. Returns
+        # (current_files, changed_files), or None if the cache can't be trusted.
+        if not cache: return None
+        # Extra files aren't in the cache proper, the last full check kept them aside
+        known = {rel_path: tuple(entry[:3]) for rel_path, entry in cache.items()}
+        known.update((rel_path, tuple(key)) for rel_path, key in self.cache_extras.items())
+        current_files = dict(known)
+        changed_files = set()
+        gone_dirs = []
+        for rel_path in self.changed:
+            full_path = os.path.join(self.folder_path, rel_path)
+            if os.path.isdir(full_path):
+                # A new or moved-in folder, everything in it is new to us
+                for sub_path, key in scan_folder(full_path).items():
+                    current_files[os.path.join(rel_path, sub_path)] = key
+                    changed_files.add(os.path.join(rel_path, sub_path))
+                gone_dirs.append(rel_path + os.sep)
+            else:
+                changed_files.add(rel_path)
+                if rel_path not in known:
+                    # Maybe a folder that was deleted or moved away
+                    gone_dirs.append(rel_path + os.sep)
+        if gone_dirs:
+            prefixes = tuple(gone_dirs)
+            changed_files.update(rel_path for rel_path in known if rel_path.startswith(prefixes))
+        for rel_path in changed_files:
+            key = self.stat_file(rel_path)
+            if key is None:
+                current_files.pop(rel_path, None)
+            else:
+                current_files[rel_path] = key
+        # A few files the watcher says nothing about must still match the cache
+        import random
+        unchanged = [rel_path for rel_path in known if rel_path not in changed_files]
+        for rel_path in random.sample(unchanged, min(SANITY_SAMPLE, len(unchanged))):
+            if self.stat_file(rel_path) != known[rel_path]:
+                return None
+        return current_files, changed_files
+
+    def locate_damage(self, failed, stats, block_size, blocks):
+        # failed = {rel_path: expected_hash}. Only files whose block manifest
+        # was made from the same content the manifest expects can be located.
+        # Block hashes from this pass are compared directly; the rest (cached
+        # or resumed files) are read again.
+        damage = {}
+        reread = []
+        for rel_path, expected_hash in failed.items():
+            entry = blocks.get(rel_path)
+            if not entry or entry[1] != expected_hash: continue
+            current = self.file_blocks.get(rel_path)
+            if current and block_size == BLOCK_SIZE:
+                damage[rel_path] = self.compare_blocks(entry, current)
+                self.report_damage(rel_path, damage[rel_path], entry, block_size, stats)
+            else:
+                reread.append((rel_path, entry))
+        if reread:
+            self.meter.set_total(self.meter.bytes_total + sum(entry[0] for _, entry in reread))
+        for index, (rel_path, entry) in enumerate(reread, 1):
+            damaged = self.damaged_blocks(os.path.join(self.folder_path, rel_path), entry, block_size)
+            self.tick(index, len(reread), force=True)
+            if damaged is None: continue
+            damage[rel_path] = damaged
+            self.report_damage(rel_path, damaged, entry, block_size, stats)
+        if self.is_running:
+            self.save_damage(block_size, damage)
+
+    def compare_blocks(self, entry, current):
+        # Damaged block indices from a block manifest entry and the
+        # [size, digest, blocks] of the file as just hashed
+        size, _, expected = entry
+        current_size, _, digests = current
+        damaged = [index for index, digest in enumerate(expected)
+                   if index >= len(digests) or digests[index] != digest]
+        if current_size > size:
+            # Anything appended past the original end counts as damage too
+            damaged.append(len(expected))
+        return damaged
+
+    def run_recheck(self, stats):
+        # Re-reads only the blocks that the last verify found damaged, e.g.
+        # after repairing a file. Everything else is assumed unchanged.
+        block_size, blocks = load_block_file(self.block_path) if self.block_path else (BLOCK_SIZE, {})
+        damage_size, damage = load_block_file(self.damage_path) if self.damage_path else (BLOCK_SIZE, {})
+        if not damage or damage_size != block_size:
+            self.log(LogStatus.WARNING, "Nothing to recheck. Run a verify with block hashes first.")
+            self.flush_log()
+            stats["error"] = "no damage list"
+            return stats
+
+        total = len(damage)
+        processed = 0
+        self.meter.start(sum(len(indices) for indices in damage.values()) * block_size)
+        for rel_path, indices in list(damage.items()):
+            if not self.is_running: break
+            entry = blocks.get(rel_path)
+            full_path = os.path.join(self.folder_path, rel_path)
+            processed += 1
+            if entry is None:
+                del damage[rel_path]
+                continue
+            if not os.path.exists(full_path):
+                self.log(LogStatus.MISSING, rel_path)
+                stats["missing"] += 1
+                continue
+            # Blocks that were past the end of the original file can't be read
+            # back, they just need the size to be right again
+            readable = [index for index in indices if index < len(entry[2])]
+            damaged = self.damaged_blocks(full_path, entry, block_size, readable)
+            if damaged is None: continue
+            if damaged:
+                self.log(LogStatus.CORRUPT, rel_path)
+                stats["bad"] += 1
+                self.report_damage(rel_path, damaged, entry, block_size, stats)
+                damage[rel_path] = damaged
+            else:
+                self.log(LogStatus.OK, rel_path)
+                stats["ok"] += 1
+                del damage[rel_path]
+            self.tick(processed, total)
+        self.tick(processed, total, force=True)
+        self.save_damage(block_size, damage)
+        self.flush_log()
+        return stats
+
+    def save_blocks(self):
+        try:
+            save_block_file(self.block_path, BLOCK_SIZE, self.file_blocks)
+            self.log(LogStatus.INFO, f"Block hashes saved for {len(self.file_blocks)} large files")
+        except OSError as e:
+            self.log(LogStatus.WARNING, f"Could not save block hashes: {e}")
+
+    def report_verify(self, rel_path, current_hash, expected_hash, stats):
+        if current_hash == expected_hash:
+            self.log(LogStatus.OK, rel_path)
+            stats["ok"] += 1
+            return True
+        else:
+            self.log(LogStatus.CORRUPT, rel_path)
+            stats["bad"] += 1
+            return False
+
+
+# --- LIBRARY SCHEDULER ---
+def list_games(library_path):
+    return sorted(entry.path for entry in os.scandir(library_path) if entry.is_dir())
+
+def device_id(path):
+    # Games with the same st_dev live on the same drive (or partition of it)
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return path
+
+class LibraryScheduler:
+    # Runs run_job(game_path) for every game, returning {game_path: result}.
+    # Games on the same device run one after another (per_device at a time),
+    # so a hard drive never has two readers seeking against each other, while
+    # games on different drives run side by side, up to max_devices at once.
+    # run_job is called from the scheduler's threads; if it raises, the
+    # result for that game is {"error": message}.
+    def __init__(self, game_paths, run_job, max_devices=0, per_device=1):
+        self.run_job = run_job
+        self.max_devices = max_devices
+        self.per_device = max(1, per_device)
+        self.lanes = {}
+        for game_path in game_paths:
+            self.lanes.setdefault(device_id(game_path), deque()).append(game_path)
+        self.results = {}
+        self.is_running = True
+
+    def stop(self):
+        # Games already running have to be stopped by whoever owns their engines
+        self.is_running = False
+
+    def drain(self, lane):
+        while self.is_running:
+            try:
+                game_path = lane.popleft()
+            except IndexError:
+                return
+            try:
+                self.results[game_path] = self.run_job(game_path)
+            except Exception as e:
+                self.results[game_path] = {"error": str(e)}
+
+    def run(self):
+        threads = len(self.lanes) * self.per_device
+        if self.max_devices > 0:
+            threads = min(threads, self.max_devices * self.per_device)
+        if threads:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                for lane in self.lanes.values():
+                    for _ in range(self.per_device):
+                        pool.submit(self.drain, lane)
+        return self.results
+
+
+# --- LIBRARY INDEX ---
+# What the GUI sidebar shows, saved so it can draw the library at launch
+# without touching the library drive, which may be a network mount or a
+# sleeping hard drive. A background scan then brings it up to date.
+# Format: {"version": 1, "library": path,
+#          "games": {game_name: {"manifest": bool, "result": state or None,
+#                                "detail": str, "checked": unix time or None,
+#                                "files": count or None, "size": bytes or None}}}
+LIBRARY_INDEX_VERSION = 1
+
+def new_index_entry():
+    return {"manifest": False, "result": None, "detail": "", "checked": None, "files": None, "size": None}
+
+def load_library_index(index_path):
+    index = {"version": LIBRARY_INDEX_VERSION, "library": "", "games": {}}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == LIBRARY_INDEX_VERSION:
+            index["library"] = data.get("library", "")
+            index["games"] = {game_name: {**new_index_entry(), **entry}
+                              for game_name, entry in data.get("games", {}).items()}
+    except (OSError, ValueError, AttributeError, TypeError):
+        pass
+    return index
+
+def save_library_index(index_path, index):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+
+# --- CHANGE WATCHER ---
+# Optional and Linux only: the kernel's inotify interface reports every file
+# that is written, created, deleted or renamed under the watched game
+# folders, so a verify only has to look at those instead of walking the whole
+# install. Each game has a dirty set of relative paths, kept in
+# Checksums/<game>.dirty.json so it survives a restart. The set is only
+# complete while the watcher runs: after a restart, a watch that couldn't be
+# added, or the kernel dropping events (IN_Q_OVERFLOW), take() says so and
+# the next verify walks the whole folder, which starts a fresh complete set.
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+# No IN_MODIFY: it fires on every write() and floods the queue during an
+# install. IN_CLOSE_WRITE covers the same files once they're done.
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# struct inotify_event: wd, mask, cookie, len, then len bytes of name
+INOTIFY_EVENT = struct.Struct("iIII")
+DIRTY_VERSION = 1
+# Files outside the dirty set that a tracked verify still stats, to catch
+# anything the watcher missed
+SANITY_SAMPLE = 32
+SAVE_INTERVAL = 2.0
+
+def load_inotify():
+    # libc with the inotify calls bound, or None where there is no inotify
+    if not sys.platform.startswith("linux"): return None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def inotify_available():
+    return load_inotify() is not None
+
+def load_dirty_set(dirty_path):
+    try:
+        with open(dirty_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != DIRTY_VERSION:
+            return set()
+        return set(data.get("paths", []))
+    except (OSError, ValueError, AttributeError, TypeError):
+        return set()
+
+def save_dirty_set(dirty_path, paths):
+    if not paths:
+        try:
+            os.remove(dirty_path)
+        except OSError:
+            pass
+        return
+    tmp_path = dirty_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": DIRTY_VERSION, "paths": sorted(paths)}, f, separators=(",", ":"))
+    os.replace(tmp_path, dirty_path)
+
+class ChangeWatcher:
+    # watch(game_paths) follows exactly those game folders (call it again
+    # whenever the library list changes). take(game_path) hands a run the
+    # paths that changed and starts a new set; give_back() returns them if
+    # that run didn't finish. The inotify fd is read on one daemon thread,
+    # take()/give_back() can be called from any thread.
+    def __init__(self, checksum_dir):
+        self.checksum_dir = checksum_dir
+        self.libc = load_inotify()
+        self.lock = threading.Lock()
+        # game_path: {"dirty": set, "complete": bool, "ready": bool, "unsaved": bool, "wds": set}
+        self.games = {}
+        self.watches = {}  # wd: (game_path, rel_dir), only touched by the thread
+        self.wanted = None
+        self.fd = -1
+        self.wake_r = self.wake_w = -1
+        self.thread = None
+        self.is_running = False
+
+    def start(self):
+        if self.libc is None:
+            raise OSError("inotify is not available on this system")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            import ctypes
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.wake_r, self.wake_w = os.pipe()
+        self.is_running = True
+        self.thread = threading.Thread(target=self.loop, name="ChangeWatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.is_running: return
+        self.is_running = False
+        os.write(self.wake_w, b"x")
+        self.thread.join()
+        for fd in (self.fd, self.wake_r, self.wake_w):
+            os.close(fd)
+        self.fd = self.wake_r = self.wake_w = -1
+
+    def watch(self, game_paths):
+        with self.lock:
+            self.wanted = [os.path.abspath(game_path) for game_path in game_paths]
+        if self.is_running:
+            os.write(self.wake_w, b"x")
+
+    def take(self, game_path):
+        # (changed_paths, complete) since the last take(), or (None, False)
+        # if the game isn't being watched. complete=False means something may
+        # have changed that isn't in the set.
+        with self.lock:
+            state = self.games.get(os.path.abspath(game_path))
+            if state is None:
+                return None, False
+            changed, complete = state["dirty"], state["complete"] and state["ready"]
+            state["dirty"] = set()
+            # From here on nothing is missed, as long as every folder has a watch
+            state["complete"] = state["ready"]
+            state["unsaved"] = True
+            return changed, complete
+
+    def give_back(self, game_path, changed, complete):
+        # For a run that was stopped or failed: it didn't check these after all
+        if changed is None: return
+        with self.lock:
+            state = self.games.get(os.path.abspath(game_path))
+            if state is None: return
+            state["dirty"].update(changed)
+            state["complete"] = state["complete"] and complete
+            state["unsaved"] = True
+
+    def loop(self):
+        last_save = time.monotonic()
+        try:
+            while self.is_running:
+                if self.wanted is not None:
+                    self.update_games()
+                ready, _, _ = select.select([self.fd, self.wake_r], [], [], SAVE_INTERVAL)
+                if self.wake_r in ready:
+                    os.read(self.wake_r, 512)
+                if self.fd in ready:
+                    self.read_events()
+                if time.monotonic() - last_save >= SAVE_INTERVAL:
+                    self.save()
+                    last_save = time.monotonic()
+        finally:
+            self.save()
+
+    def update_games(self):
+        with self.lock:
+            wanted, self.wanted = set(self.wanted), None
+            removed = [game_path for game_path in self.games if game_path not in wanted]
+            # Also retries games whose watches couldn't all be added last time
+            added = sorted(game_path for game_path in wanted
+                           if game_path not in self.games or not self.games[game_path]["ready"])
+            for game_path in added:
+                if game_path in self.games: continue
+                # Whatever changed while nobody was watching is unknown, but
+                # what was already dirty stays dirty
+                self.games[game_path] = {"dirty": load_dirty_set(self.dirty_path(game_path)), "complete": False,
+                                         "ready": False, "unsaved": False, "wds": set()}
+        self.save()
+        for game_path in removed:
+            with self.lock:
+                state = self.games.pop(game_path)
+            for wd in state["wds"]:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.watches.pop(wd, None)
+        for game_path in added:
+            if not self.is_running or self.wanted is not None: break
+            state = self.games[game_path]
+            ready = self.add_tree(game_path, "", state)
+            with self.lock:
+                state["ready"] = ready
+
+    def add_tree(self, game_path, rel_dir, state):
+        # Watches rel_dir and every folder below it (inotify isn't recursive).
+        # False if any of them couldn't be watched, e.g. the
+        # fs.inotify.max_user_watches limit was hit.
+        ok = True
+        pending = [rel_dir]
+        while pending:
+            rel_dir = pending.pop()
+            full_path = os.path.join(game_path, rel_dir) if rel_dir else game_path
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(full_path), WATCH_MASK)
+            if wd < 0:
+                ok = False
+                continue
+            self.watches[wd] = (game_path, rel_dir)
+            state["wds"].add(wd)
+            try:
+                with os.scandir(full_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+            except OSError:
+                continue
+        return ok
+
+    def read_events(self):
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                self.handle_event(wd, mask, os.fsdecode(name))
+
+    def handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped, nobody knows what changed anymore
+            with self.lock:
+                for state in self.games.values():
+                    state["complete"] = False
+            return
+        watch = self.watches.get(wd)
+        if watch is None: return
+        game_path, rel_dir = watch
+        state = self.games.get(game_path)
+        if state is None: return
+        if mask & IN_IGNORED:
+            # The folder is gone, its parent already reported it
+            del self.watches[wd]
+            state["wds"].discard(wd)
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            if not rel_dir:
+                # The game folder itself was deleted or renamed
+                with self.lock:
+                    state["complete"] = state["ready"] = False
+            return
+        if not name: return
+        rel_path = os.path.join(rel_dir, name) if rel_dir else name
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            # A new folder needs watches of its own, and so does anything
+            # created inside it before we got here
+            if not self.add_tree(game_path, rel_path, state):
+                with self.lock:
+                    state["complete"] = state["ready"] = False
+        with self.lock:
+            state["dirty"].add(rel_path)
+            state["unsaved"] = True
+
+    def dirty_path(self, game_path):
+        return dirty_path_for(self.checksum_dir, os.path.basename(game_path))
+
+    def save(self):
+        with self.lock:
+            todo = []
+            for game_path, state in self.games.items():
+                if state["unsaved"]:
+                    todo.append((game_path, set(state["dirty"])))
+                    state["unsaved"] = False
+        for game_path, paths in todo:
+            try:
+                save_dirty_set(self.dirty_path(game_path), paths)
+            except OSError:
+                pass